@@ -0,0 +1,189 @@
+#
+# Copyright (c) 2020 Xilinx, Inc. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+
+"""
+Boot time profiling of consoles from milestones streaming past.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from statistics import median
+from typing import List, Optional, Tuple
+from filelock import FileLock
+from roast.utils import read_json, write_json
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MILESTONES = [
+    ("bootloader", r"U-Boot \d"),
+    ("kernel", r"Starting kernel|Booting Linux"),
+    ("init", r"Run /sbin/init|systemd\[1\]|INIT: version"),
+    ("login", r"login:"),
+]
+
+
+class BootProfiler:
+    """Timestamps boot milestones as console data streams past.
+
+    The profiler is a console reader, so milestones are detected on data
+    the test reads anyway and no extra expects are sent. Each milestone
+    is recorded once, at the arrival time of the data completing its
+    match, relative to start().
+
+    Args:
+        milestones (list): (name, regex) pairs. Defaults to
+            bootloader, kernel, init and login.
+        window (int): Characters kept from previous data so that matches
+            split across reads are found. Defaults to 256.
+    """
+
+    def __init__(
+        self, milestones: Optional[List[Tuple[str, str]]] = None, window: int = 256
+    ) -> None:
+        if milestones is None:
+            milestones = DEFAULT_MILESTONES
+        self.milestones = [(name, re.compile(regex)) for name, regex in milestones]
+        self.window = window
+        self.console = None
+        self.done = threading.Event()
+        self.start()
+
+    def start(self) -> None:
+        """Clears recorded milestones and restarts the boot clock."""
+        self.profile = {}
+        self._pending = list(self.milestones)
+        self._tail = ""
+        self._start = time.monotonic()
+        self.done.clear()
+
+    def write(self, data) -> None:
+        if not self._pending:
+            return
+        now = time.monotonic() - self._start
+        if isinstance(data, bytes):
+            data = data.decode("utf-8", errors="replace")
+        text = self._tail + data
+        for milestone in list(self._pending):
+            name, regex = milestone
+            if regex.search(text):
+                self.profile[name] = round(now, 3)
+                self._pending.remove(milestone)
+                log.debug(f"Boot milestone {name} at {now:.3f}s")
+        self._tail = text[-self.window :]
+        if not self._pending:
+            self.done.set()
+
+    def flush(self) -> None:
+        pass
+
+    def attach(self, console) -> "BootProfiler":
+        """Starts profiling data read by an Xexpect console."""
+        self.start()
+        self.console = console
+        console.add_reader(self)
+        return self
+
+    def detach(self) -> None:
+        """Stops profiling the attached console."""
+        if self.console is not None:
+            self.console.remove_reader(self)
+            self.console = None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Waits until all milestones are seen.
+
+        Returns:
+            bool: True if all milestones were seen within timeout.
+        """
+        return self.done.wait(timeout)
+
+    @property
+    def missing(self) -> list:
+        """Names of milestones not seen yet."""
+        return [name for name, _ in self._pending]
+
+    def save(self, store_path: str, label: str = "") -> dict:
+        """Appends this boot's profile to a JSON history shared across runs.
+
+        Args:
+            store_path (str): JSON file holding profiles of previous boots.
+            label (str): Run label such as board or build id. Defaults to "".
+
+        Returns:
+            dict: Stored run.
+        """
+        run = {"time": time.time(), "label": label, "milestones": dict(self.profile)}
+        with FileLock(f"{store_path}.lock"):
+            history = load_profiles(store_path)
+            history.append(run)
+            write_json(store_path, history)
+        return run
+
+    def compare(
+        self, store_path: str, label: Optional[str] = None, runs: int = 5, **kwargs
+    ) -> dict:
+        """Compares this boot with the median of previous boots in a history.
+
+        Args:
+            store_path (str): JSON file written by save().
+            label (str): Only compare with runs of this label. Defaults to None.
+            runs (int): Number of most recent runs forming the baseline. Defaults to 5.
+            kwargs: Options passed to compare_profiles.
+
+        Returns:
+            dict: Comparison as returned by compare_profiles.
+        """
+        history = [
+            run["milestones"]
+            for run in load_profiles(store_path)
+            if label is None or run.get("label") == label
+        ][-runs:]
+        baseline = {}
+        for name in {name for profile in history for name in profile}:
+            samples = [profile[name] for profile in history if name in profile]
+            baseline[name] = median(samples)
+        return compare_profiles(baseline, self.profile, **kwargs)
+
+
+def load_profiles(store_path: str) -> list:
+    """Returns the boot profiles stored by BootProfiler.save."""
+    if not os.path.isfile(store_path):
+        return []
+    return read_json(store_path)
+
+
+def compare_profiles(
+    baseline: dict, current: dict, threshold: float = 0.1, min_delta: float = 0.5
+) -> dict:
+    """Compares milestone times of two boot profiles.
+
+    A milestone regresses when it is later than the baseline by more than
+    threshold (relative) and min_delta seconds.
+
+    Args:
+        baseline (dict): Milestone times of the reference boot.
+        current (dict): Milestone times of the boot under test.
+        threshold (float): Relative slowdown tolerated. Defaults to 0.1.
+        min_delta (float): Absolute slowdown tolerated in seconds. Defaults to 0.5.
+
+    Returns:
+        dict: Per milestone baseline, current, delta and regression flag.
+    """
+    result = {}
+    for name in baseline.keys() | current.keys():
+        base, cur = baseline.get(name), current.get(name)
+        entry = {"baseline": base, "current": cur, "delta": None, "regression": False}
+        if base is not None and cur is not None:
+            delta = round(cur - base, 3)
+            entry["delta"] = delta
+            entry["regression"] = delta > max(base * threshold, min_delta)
+        elif base is not None:
+            # Milestone no longer reached
+            entry["regression"] = True
+        result[name] = entry
+    return result
@@ -3,12 +3,32 @@
 # SPDX-License-Identifier: MIT
 #
 
+import os
+import time
 import socket
+import logging
+import posixpath
+import threading
+import pexpect
+from typing import Callable, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from abc import ABCMeta, abstractmethod
-from stevedore import driver
+from roast.ssh import target_hashes
+from roast.utils import HashCache, transfer_metrics, load_driver, emit_event
+from roast.exceptions import FleetError
+from roast.xexpect import Xexpect
+from roast.telemetry import TelemetrySampler
+
+log = logging.getLogger(__name__)
 
 
 class BoardBase(metaclass=ABCMeta):
+    # Last known target address per board and interface, shared across instances
+    _target_ip_cache = {}
+    # Drivers whose put() and get() can run concurrently set this, as
+    # transfers usually share one console
+    transfer_thread_safe = False
+
     def __init__(self) -> None:
         self.config = {}
         self.isLive = False
@@ -24,6 +44,7 @@ class BoardBase(metaclass=ABCMeta):
         self.first_boot = True
         self.target_user = "root"
         self.target_password = "root"
+        self.relay = None
 
     @abstractmethod
     def start(self) -> None:
@@ -51,35 +72,367 @@ class BoardBase(metaclass=ABCMeta):
     def reset(self) -> None:
         """Reset or reconnect."""
 
+    def _transfer_many(self, transfer, manifest, max_workers: Optional[int]) -> None:
+        if not self.transfer_thread_safe:
+            if max_workers not in (None, 1):
+                log.warning(
+                    f"{type(self).__name__} transfers are not thread safe, "
+                    "running them one at a time"
+                )
+            max_workers = 1
+        elif max_workers is None:
+            max_workers = 4
+        errors = []
+
+        def _transfer(item):
+            try:
+                transfer(*item)
+            except Exception as e:
+                log.error(f"Transfer of {item[0]} to {item[1]} failed: {e}")
+                errors.append(e)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(_transfer, manifest))
+        if errors:
+            raise errors[0]
+
+    def put_many(
+        self, manifest: List[Tuple[str, str]], max_workers: Optional[int] = None
+    ) -> None:
+        """Transfer many files to target.
+
+        The default implementation runs put() for the entries, on a thread
+        pool if the driver sets transfer_thread_safe and one at a time
+        otherwise. Drivers with a batched or streamed transfer override it.
+
+        Args:
+            manifest (list): (src_file, dest_path) pairs.
+            max_workers (int): Maximum concurrent transfers of thread safe
+                drivers. Defaults to 4.
+
+        Raises:
+            Exception: The first transfer error, after all transfers ran.
+        """
+        self._transfer_many(self.put, manifest, max_workers)
+
+    def get_many(
+        self, manifest: List[Tuple[str, str]], max_workers: Optional[int] = None
+    ) -> None:
+        """Transfer many files from target.
+
+        The default implementation runs get() for the entries, on a thread
+        pool if the driver sets transfer_thread_safe and one at a time
+        otherwise. Drivers with a batched or streamed transfer override it.
+
+        Args:
+            manifest (list): (src_file, dest_path) pairs of target files
+                and host paths.
+            max_workers (int): Maximum concurrent transfers of thread safe
+                drivers. Defaults to 4.
+
+        Raises:
+            Exception: The first transfer error, after all transfers ran.
+        """
+        self._transfer_many(self.get, manifest, max_workers)
+
+    def put_changed(
+        self, src_files: List[str], dest_path: str, cache_file: Optional[str] = None
+    ) -> List[str]:
+        """Transfer files to target, skipping those already deployed unchanged.
+
+        Args:
+            src_files (list): Paths to files.
+            dest_path (str): Target directory path.
+            cache_file (str): Host hash cache file. Defaults to HashCache default.
+
+        Returns:
+            list: Paths of the transferred files.
+        """
+        console = self.target_console or self.serial
+        dest_files = {
+            f: posixpath.join(dest_path, os.path.basename(f)) for f in src_files
+        }
+        cache = HashCache(cache_file)
+        remote = target_hashes(console, list(dest_files.values()))
+        changed = [
+            f for f, dest in dest_files.items() if remote.get(dest) != cache.hash(f)
+        ]
+        cache.save()
+        for src_file in changed:
+            self.put(src_file, dest_path)
+        return changed
+
+    def power_cycle(
+        self,
+        relay=None,
+        off_time: int = 5,
+        milestones: Optional[list] = None,
+        ready: str = "login",
+        timeout: int = 300,
+    ) -> dict:
+        """Power cycles the board and returns as soon as it is ready.
+
+        Instead of fixed waits the serial console is read until the ready
+        milestone streams past, while the other boot milestones are
+        timestamped on the way. The console is left positioned after the
+        ready milestone, e.g. at the login prompt.
+
+        Args:
+            relay: Relay facade or driver. Defaults to the board's relay.
+            off_time (int): Seconds the board stays powered off. Defaults to 5.
+            milestones (list): (name, regex) boot milestones. Defaults to
+                BootProfiler's.
+            ready (str): Milestone marking the board ready. Defaults to "login".
+            timeout (int): Seconds to wait for the ready milestone. Defaults to 300.
+
+        Returns:
+            dict: Reset latency in seconds from power on to ready and the
+            boot profile.
+
+        Raises:
+            ExpectError: Raised when the board is not ready within timeout.
+        """
+        relay = relay or self.relay
+        if relay is None:
+            raise ValueError("No relay to power cycle the board with")
+        console = self.serial.console
+        relay.disconnect()
+        # Drop console output from before the power cycle
+        console.terminal.expect([pexpect.TIMEOUT, pexpect.EOF], timeout=0)
+        console.terminal.buffer = console.terminal.string_type()
+        time.sleep(off_time)
+        relay.connect()
+        profiler = self.serial.profile_boot(milestones)
+        try:
+            pattern = dict(profiler.milestones)[ready].pattern
+            self.serial.expect(expected=pattern, wait_for_prompt=False, timeout=timeout)
+        finally:
+            profiler.detach()
+        latency = profiler.profile[ready]
+        self.reset_latency = latency
+        target = self.target_ip or console.hostname
+        log.info(f"{target} ready {latency:.1f}s after power on")
+        emit_event(
+            {"kind": "reset", "target": target, "duration": latency, "status": "ok"}
+        )
+        return {"latency": latency, "profile": dict(profiler.profile)}
+
+    def start_telemetry(self, console=None, **kwargs) -> TelemetrySampler:
+        """Starts sampling target CPU, memory and thermal telemetry.
+
+        Args:
+            console: Console dedicated to sampling. Defaults to a new ssh
+                console to the target.
+            kwargs: Options passed to TelemetrySampler.
+
+        Returns:
+            Started TelemetrySampler; stop() it and attach() it to the result.
+        """
+        if console is None:
+            console = Xexpect(
+                log,
+                hostname=self.target_ip,
+                hostip=self.target_ip,
+                userid=self.target_user,
+                password=self.target_password,
+            )
+        return TelemetrySampler(console, **kwargs).start()
+
     def _set_host(self) -> None:
         self.host = self.config.get("remote_host", socket.gethostname())
 
-    def _get_target_ip(self) -> None:
-        self.serial.sendline("ifconfig eth0")
+    def _get_target_ip(self, interface: Optional[str] = None) -> None:
+        self.resolve_target_ip(interface)
+
+    def _query_target_ip(self, interface: str) -> str:
+        self.serial.sendline(f"ifconfig {interface}")
         self.serial.expect(expected=["# ", r"\$ "], timeout=10, wait_for_prompt=False)
-        self.target_ip = self.serial.search("(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})")
+        return self.serial.search(r"(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})")
+
+    @staticmethod
+    def _probe_ip(ip: str, port: int, timeout: float) -> bool:
+        try:
+            with socket.create_connection((ip, port), timeout=timeout):
+                return True
+        except OSError:
+            return False
+
+    def _board_id(self) -> Tuple:
+        # The "board" name, else the serial port the board is wired to
+        board = self.config.get("board")
+        if board:
+            return ("board", board)
+        port = (getattr(self.serial, "config", None) or {}).get("com")
+        if port:
+            return ("serial", self.host, getattr(self.serial, "hostname", None), port)
+        # Nothing tells boards apart, keep the address to this instance
+        return ("instance", id(self))
+
+    def resolve_target_ip(
+        self,
+        interface: Optional[str] = None,
+        refresh: bool = False,
+        probe_port: int = 22,
+        probe_timeout: float = 1.0,
+    ) -> str:
+        """Returns the target address, querying the serial console only when needed.
+
+        The last address of the board is remembered and reused as long as a
+        short connect probe to probe_port succeeds, e.g. after a reboot with
+        an unchanged DHCP lease. Otherwise the address is read from
+        ifconfig output on the serial console. Boards are told apart by
+        the "board" config option, else by the "com" port of their serial
+        console.
+
+        Args:
+            interface (str): Target network interface. Defaults to the
+                "target_interface" config option or eth0.
+            refresh (bool): Skip the cached address. Defaults to False.
+            probe_port (int): TCP port probed on the cached address. Defaults to 22.
+            probe_timeout (float): Probe timeout in seconds. Defaults to 1.0.
+
+        Returns:
+            str: Target address, also stored in target_ip.
+        """
+        if interface is None:
+            interface = self.config.get("target_interface", "eth0")
+        key = (self._board_id(), interface)
+        ip = self._target_ip_cache.get(key)
+        if refresh or not ip or not self._probe_ip(ip, probe_port, probe_timeout):
+            ip = self._query_target_ip(interface)
+            if ip:
+                self._target_ip_cache[key] = ip
+        self.target_ip = ip
+        return ip
 
 
 class Board:
     def __init__(self, board_type: str) -> None:
-        self._board_mgr = driver.DriverManager(
-            namespace="roast.board",
-            name=board_type,
-            invoke_on_load=True,
-        )
+        self.board_type = board_type
+        self._board_mgr = load_driver("roast.board", board_type)
 
     @property
     def driver(self):
         return self._board_mgr.driver
 
+    @property
+    def _target(self):
+        return getattr(self.driver, "target_ip", None) or self.board_type
+
     def start(self) -> None:
         self.driver.start()
 
     def put(self, src_file, dest_path) -> None:
-        self.driver.put(src_file, dest_path)
+        size = os.path.getsize(src_file) if os.path.isfile(src_file) else 0
+        with transfer_metrics("put", target=self._target, files=1, bytes=size):
+            self.driver.put(src_file, dest_path)
 
     def get(self, src_file, dest_path) -> None:
-        self.driver.get(src_file, dest_path)
+        with transfer_metrics("get", target=self._target, files=1) as event:
+            self.driver.get(src_file, dest_path)
+            dest_file = os.path.join(dest_path, os.path.basename(src_file))
+            for path in (dest_file, dest_path):
+                if os.path.isfile(path):
+                    event["bytes"] = os.path.getsize(path)
+                    break
+
+    def put_many(self, manifest, **kwargs) -> None:
+        size = sum(os.path.getsize(src) for src, _ in manifest if os.path.isfile(src))
+        with transfer_metrics(
+            "put_many", target=self._target, files=len(manifest), bytes=size
+        ):
+            self.driver.put_many(manifest, **kwargs)
+
+    def get_many(self, manifest, **kwargs) -> None:
+        with transfer_metrics("get_many", target=self._target, files=len(manifest)):
+            self.driver.get_many(manifest, **kwargs)
+
+    def put_changed(self, src_files, dest_path, cache_file=None):
+        return self.driver.put_changed(src_files, dest_path, cache_file)
 
     def reset(self) -> None:
         self.driver.reset()
+
+
+def start_fleet(
+    boards: Dict[str, object],
+    quorum: Optional[int] = None,
+    max_workers: int = 8,
+    timeout: Optional[float] = None,
+    on_progress: Optional[Callable[[str, dict], None]] = None,
+) -> Dict[str, dict]:
+    """Starts many boards concurrently and returns once a quorum is ready.
+
+    Boards are started on a bounded thread pool. Boards still booting when
+    the quorum is reached keep starting in the background, their summary
+    entries are updated in place.
+
+    Args:
+        boards (dict): Board facades or BoardBase drivers by name.
+        quorum (int): Number of boards that must be ready. Defaults to all.
+        max_workers (int): Maximum concurrent starts. Defaults to 8.
+        timeout (float): Seconds to wait for the quorum. Defaults to None.
+        on_progress (callable): Called with name and summary entry on every
+            status change. Defaults to None.
+
+    Returns:
+        dict: Summary by name with status ("pending", "starting", "ready" or
+        "failed"), duration and error.
+
+    Raises:
+        FleetError: Raised when the quorum can not be or was not reached
+            within timeout.
+    """
+    quorum = len(boards) if quorum is None else quorum
+    summary = {
+        name: {"status": "pending", "duration": None, "error": None} for name in boards
+    }
+    cond = threading.Condition()
+
+    def _update(name, **fields):
+        with cond:
+            summary[name].update(fields)
+            cond.notify_all()
+        if on_progress is not None:
+            on_progress(name, dict(summary[name]))
+
+    def _start(name, board):
+        _update(name, status="starting")
+        start = time.monotonic()
+        try:
+            board.start()
+            _update(name, status="ready", duration=time.monotonic() - start)
+        except Exception as e:
+            log.error(f"Failed to start {name}: {e}")
+            _update(
+                name, status="failed", duration=time.monotonic() - start, error=str(e)
+            )
+
+    def _count(status):
+        return sum(entry["status"] == status for entry in summary.values())
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    for name, board in boards.items():
+        executor.submit(_start, name, board)
+    # Boards beyond the quorum finish in the background
+    executor.shutdown(wait=False)
+
+    with cond:
+        cond.wait_for(
+            lambda: _count("ready") >= quorum
+            or _count("failed") > len(boards) - quorum,
+            timeout,
+        )
+        ready = _count("ready")
+        failed = [
+            name for name, entry in summary.items() if entry["status"] == "failed"
+        ]
+    log.info(f"{ready} of {len(boards)} boards ready, quorum {quorum}")
+    if ready < quorum:
+        err = FleetError(
+            f"Only {ready} of {len(boards)} boards ready, quorum {quorum}"
+            + (f", failed: {', '.join(failed)}" if failed else "")
+        )
+        err.summary = summary
+        raise err
+    return summary
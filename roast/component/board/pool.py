@@ -0,0 +1,202 @@
+#
+# Copyright (c) 2020 Xilinx, Inc. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+
+import os
+import time
+import uuid
+import socket
+import logging
+from contextlib import contextmanager
+from typing import List, Optional
+from filelock import FileLock
+from roast.utils import read_json, write_json
+
+log = logging.getLogger(__name__)
+
+
+class BoardLease:
+    """A board leased from a BoardPool, released on leaving a with block.
+
+    Set healthy to False before release to report a board failure.
+    """
+
+    def __init__(self, pool, name: str, holder: str) -> None:
+        self.pool = pool
+        self.name = name
+        self.holder = holder
+        self.healthy = True
+        self.released = False
+
+    def renew(self) -> None:
+        """Extends the lease by the pool's lease timeout."""
+        self.pool.renew(self)
+
+    def release(self) -> None:
+        self.pool.release(self, healthy=self.healthy)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class BoardPool:
+    """Leases boards of a rack to workers of one or more processes.
+
+    Pool state is kept in a JSON file guarded by a file lock, so workers
+    of parallel test processes on a host coordinate through it. Waiting
+    workers are served first come first served. Leases not renewed within
+    lease_timeout are reclaimed from crashed workers, and boards released
+    unhealthy max_failures times in a row are taken out of rotation until
+    marked healthy again.
+
+    Args:
+        boards (list): Board names.
+        state_path (str): JSON file holding the pool state.
+        lease_timeout (float): Seconds a lease is valid without renewal. Defaults to 3600.
+        max_failures (int): Consecutive failures retiring a board. Defaults to 3.
+    """
+
+    def __init__(
+        self,
+        boards: List[str],
+        state_path: str,
+        lease_timeout: float = 3600,
+        max_failures: int = 3,
+    ) -> None:
+        self.boards = list(boards)
+        self.state_path = state_path
+        self.lease_timeout = lease_timeout
+        self.max_failures = max_failures
+
+    @contextmanager
+    def _state(self):
+        # A lock instance per operation, so threads exclude each other too
+        with FileLock(f"{self.state_path}.lock"):
+            state = {"boards": {}, "queue": []}
+            if os.path.isfile(self.state_path):
+                state = read_json(self.state_path)
+            for name in self.boards:
+                state["boards"].setdefault(
+                    name,
+                    {
+                        "holder": None,
+                        "expires": 0,
+                        "healthy": True,
+                        "failures": 0,
+                        "leases": 0,
+                    },
+                )
+            yield state
+            write_json(self.state_path, state)
+
+    def _reclaim(self, state: dict, now: float, stale: float) -> None:
+        for name, board in state["boards"].items():
+            if board["holder"] is not None and board["expires"] < now:
+                log.warning(f"Lease of {name} by {board['holder']} expired")
+                board["holder"] = None
+        # Forget workers which stopped waiting without dequeuing
+        state["queue"] = [t for t in state["queue"] if now - t["seen"] < stale]
+
+    def acquire(self, timeout: Optional[float] = None, poll: float = 1.0) -> BoardLease:
+        """Leases a free healthy board, waiting for one in turn if needed.
+
+        Among free boards the least used one is picked.
+
+        Args:
+            timeout (float): Seconds to wait. Defaults to None, waiting forever.
+            poll (float): Seconds between checks for a free board. Defaults to 1.0.
+
+        Returns:
+            BoardLease of the board.
+
+        Raises:
+            TimeoutError: Raised when no board was leased within timeout.
+        """
+        ticket = uuid.uuid4().hex
+        holder = f"{socket.gethostname()}:{os.getpid()}:{ticket[:8]}"
+        stale = max(poll * 10, 60)
+        start = time.monotonic()
+        while True:
+            with self._state() as state:
+                now = time.time()
+                self._reclaim(state, now, stale)
+                queue = state["queue"]
+                for entry in queue:
+                    if entry["id"] == ticket:
+                        entry["seen"] = now
+                        break
+                else:
+                    queue.append({"id": ticket, "seen": now})
+                free = [
+                    name
+                    for name in self.boards
+                    if state["boards"][name]["holder"] is None
+                    and state["boards"][name]["healthy"]
+                ]
+                if free and queue[0]["id"] == ticket:
+                    name = min(free, key=lambda n: state["boards"][n]["leases"])
+                    board = state["boards"][name]
+                    board["holder"] = holder
+                    board["expires"] = now + self.lease_timeout
+                    board["leases"] += 1
+                    queue.pop(0)
+                    log.info(f"Leased {name} to {holder}")
+                    return BoardLease(self, name, holder)
+                timed_out = timeout is not None and time.monotonic() - start >= timeout
+                if timed_out:
+                    state["queue"] = [t for t in queue if t["id"] != ticket]
+            if timed_out:
+                raise TimeoutError(f"No board leased within {timeout}s")
+            time.sleep(poll)
+
+    def renew(self, lease: BoardLease) -> None:
+        """Extends a lease by lease_timeout.
+
+        Raises:
+            RuntimeError: Raised when the lease was reclaimed.
+        """
+        with self._state() as state:
+            board = state["boards"][lease.name]
+            if board["holder"] != lease.holder:
+                raise RuntimeError(f"Lease of {lease.name} was reclaimed")
+            board["expires"] = time.time() + self.lease_timeout
+
+    def release(self, lease: BoardLease, healthy: bool = True) -> None:
+        """Returns a leased board to the pool.
+
+        Args:
+            lease (BoardLease): Lease returned by acquire().
+            healthy (bool): False records a failure of the board. Defaults to True.
+        """
+        if lease.released:
+            return
+        lease.released = True
+        with self._state() as state:
+            board = state["boards"][lease.name]
+            if board["holder"] == lease.holder:
+                board["holder"] = None
+            if healthy:
+                board["failures"] = 0
+            else:
+                board["failures"] += 1
+                if board["failures"] >= self.max_failures:
+                    board["healthy"] = False
+                    log.error(f"Taking {lease.name} out of the pool")
+        log.info(f"Released {lease.name}")
+
+    def mark_healthy(self, name: str, healthy: bool = True) -> None:
+        """Puts a board back into rotation, or takes it out."""
+        with self._state() as state:
+            board = state["boards"][name]
+            board["healthy"] = healthy
+            board["failures"] = 0
+
+    def status(self) -> dict:
+        """Returns holder, expiry, health, failures and lease count per board."""
+        with self._state() as state:
+            self._reclaim(state, time.time(), float("inf"))
+            return {name: dict(state["boards"][name]) for name in self.boards}
@@ -0,0 +1,131 @@
+#
+# Copyright (c) 2020 Xilinx, Inc. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+import threading
+from typing import List, Tuple
+from filelock import FileLock
+from roast.utils import HashCache, read_json, write_json, mkdir
+
+log = logging.getLogger(__name__)
+
+
+class BuildCache:
+    """Content-addressed store of system component build outputs.
+
+    Output files are stored once per content under objects/<sha256>, a
+    manifest per build key maps output paths to their objects and holds
+    the build result. Paths inside the parent of the cache directory,
+    normally buildDir, are stored relative to it.
+
+    Args:
+        root (str): Cache directory, e.g. <buildDir>/.build_cache.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self.base = os.path.dirname(os.path.abspath(root))
+        self.objects = os.path.join(root, "objects")
+        self.manifests = os.path.join(root, "manifests")
+        mkdir(self.objects)
+        mkdir(self.manifests)
+        self.hashes = HashCache(os.path.join(root, "hashes.json"), algorithm="sha256")
+        # Components may be built and cached from several threads
+        self._lock = threading.Lock()
+
+    def key(self, name: str, config, inputs: List[str], deps: List[str] = ()) -> str:
+        """Fingerprints a component build.
+
+        Args:
+            name (str): Component name.
+            config: Configuration subtree of the component, a Configuration
+                is fingerprinted unmasked through as_dict().
+            inputs (list): Input files or directories of the build.
+            deps (list): Build keys of components it depends on.
+
+        Returns:
+            str: Build key.
+        """
+        # str() of a Configuration masks secrets, changed ones would match
+        if hasattr(config, "as_dict"):
+            config = config.as_dict()
+        h = hashlib.sha256()
+        h.update(name.encode())
+        h.update(json.dumps(config, sort_keys=True, default=str).encode())
+        with self._lock:
+            for path in sorted(self._files(inputs)):
+                h.update(path.encode())
+                h.update(self.hashes.hash(path).encode())
+            self.hashes.save()
+        for dep in deps:
+            h.update(dep.encode())
+        return h.hexdigest()
+
+    @staticmethod
+    def _files(paths: List[str]) -> List[str]:
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                for dirpath, _, filenames in os.walk(path):
+                    files.extend(os.path.join(dirpath, f) for f in filenames)
+            else:
+                files.append(path)
+        return [os.path.abspath(f) for f in files]
+
+    def _manifest(self, key: str) -> str:
+        return os.path.join(self.manifests, f"{key}.json")
+
+    def fetch(self, key: str) -> Tuple[bool, object]:
+        """Restores the outputs of a cached build.
+
+        Returns:
+            tuple: Whether the build was cached and its result.
+        """
+        manifest_file = self._manifest(key)
+        if not os.path.isfile(manifest_file):
+            return False, None
+        manifest = read_json(manifest_file)
+        for path, digest in manifest["files"].items():
+            obj = os.path.join(self.objects, digest)
+            if not os.path.isfile(obj):
+                log.warning(f"Build cache object of {path} missing")
+                return False, None
+        for path, digest in manifest["files"].items():
+            dest = os.path.join(self.base, path)
+            mkdir(os.path.dirname(dest))
+            shutil.copy2(os.path.join(self.objects, digest), dest)
+        return True, manifest["result"]
+
+    def store(self, key: str, result, outputs: List[str]) -> bool:
+        """Stores the outputs and result of a build.
+
+        Returns:
+            bool: False if the result can not be cached.
+        """
+        try:
+            json.dumps(result)
+        except (TypeError, ValueError):
+            log.debug(f"Build result {result!r} is not cacheable")
+            return False
+        files = {}
+        for path in self._files(outputs):
+            with self._lock:
+                digest = self.hashes.hash(path)
+            obj = os.path.join(self.objects, digest)
+            if not os.path.isfile(obj):
+                tmp = f"{obj}.{os.getpid()}.{threading.get_ident()}.tmp"
+                shutil.copy2(path, tmp)
+                os.replace(tmp, obj)
+            rel = os.path.relpath(path, self.base)
+            files[path if rel.startswith(os.pardir) else rel] = digest
+        with self._lock:
+            self.hashes.save()
+        with FileLock(f"{self._manifest(key)}.lock"):
+            write_json(self._manifest(key), {"result": result, "files": files})
+        return True
@@ -3,9 +3,14 @@
 # SPDX-License-Identifier: MIT
 #
 
+import time
+import logging
+from typing import Dict, List, Optional
 from abc import ABCMeta, abstractmethod
-from stevedore import driver
-from roast.utils import register_plugin
+from concurrent.futures import ThreadPoolExecutor
+from roast.utils import register_plugin, load_driver
+
+log = logging.getLogger(__name__)
 
 
 class RelayBase(metaclass=ABCMeta):
@@ -36,25 +41,116 @@ class Relay:
                 "relay",
                 "roast.component.relay:DummyRelay",
             )
-        self._relay_mgr = driver.DriverManager(
-            namespace="roast.relay",
-            name=relay_type,
-            invoke_on_load=True,
-            invoke_kwds=kwargs,
-        )
+        self._relay_mgr = load_driver("roast.relay", relay_type, invoke_kwds=kwargs)
+        self.state = None  # Last commanded state, "on", "off" or None if unknown
 
     @property
     def driver(self):
         return self._relay_mgr.driver
 
-    def disconnect(self) -> None:
-        self.driver.disconnect()
+    def disconnect(self, force: bool = False) -> None:
+        if self.state != "off" or force:
+            self.driver.disconnect()
+            self.state = "off"
 
-    def connect(self) -> None:
-        self.driver.connect()
+    def connect(self, force: bool = False) -> None:
+        if self.state != "on" or force:
+            self.driver.connect()
+            self.state = "on"
 
     def reconnect(self, seconds: int = 5) -> None:
         self.driver.reconnect(seconds)
+        self.state = "on"
+
+
+class RelayFleet:
+    """Power cycles many relays, staggering power on to limit inrush current.
+
+    Relays are switched off together, then switched on group by group with
+    the relays of a group switched concurrently and a pause between
+    groups. Relays already in the requested state are skipped.
+
+    Args:
+        relays (dict): Relay facades by name.
+        group_size (int): Relays switched on together. Defaults to 4.
+        stagger (float): Seconds between groups. Defaults to 1.0.
+        groups (list): Explicit groups of relay names, overriding group_size.
+            Defaults to None.
+    """
+
+    def __init__(
+        self,
+        relays: Dict[str, Relay],
+        group_size: int = 4,
+        stagger: float = 1.0,
+        groups: Optional[List[List[str]]] = None,
+    ) -> None:
+        self.relays = relays
+        self.stagger = stagger
+        names = list(relays)
+        self.groups = groups or [
+            names[i : i + group_size] for i in range(0, len(names), group_size)
+        ]
+
+    def _switch(self, names: List[str], action: str) -> dict:
+        start = time.monotonic()
+        failed = {}
+
+        def _run(name):
+            try:
+                getattr(self.relays[name], action)()
+            except Exception as e:
+                log.error(f"Relay {name} {action} failed: {e}")
+                failed[name] = str(e)
+
+        with ThreadPoolExecutor(max_workers=max(len(names), 1)) as executor:
+            list(executor.map(_run, names))
+        return {
+            "relays": list(names),
+            "duration": time.monotonic() - start,
+            "failed": failed,
+        }
+
+    def power_off(self) -> dict:
+        """Switches all relays off at once.
+
+        Returns:
+            dict: Relays, duration and failures by name.
+        """
+        return self._switch(list(self.relays), "disconnect")
+
+    def power_on(self) -> List[dict]:
+        """Switches relays on group by group.
+
+        Returns:
+            list: Relays, duration and failures by name per group.
+        """
+        timings = []
+        for index, group in enumerate(self.groups):
+            if index:
+                time.sleep(self.stagger)
+            timing = self._switch(group, "connect")
+            log.info(
+                f"Relay group {index} on in {timing['duration']:.2f}s: "
+                f"{', '.join(group)}"
+            )
+            timings.append(timing)
+        return timings
+
+    def power_cycle(self, seconds: int = 5) -> dict:
+        """Switches all relays off and back on in staggered groups.
+
+        Args:
+            seconds (int): Time the relays stay off. Defaults to 5.
+
+        Returns:
+            dict: "off" timing, "groups" timings and total "duration".
+        """
+        start = time.monotonic()
+        off = self.power_off()
+        time.sleep(seconds)
+        groups = self.power_on()
+        return {"off": off, "groups": groups, "duration": time.monotonic() - start}
 
 
 class DummyRelay(RelayBase):
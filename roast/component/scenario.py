@@ -3,8 +3,15 @@
 # SPDX-License-Identifier: MIT
 #
 
+import os
+import time
+import logging
 from abc import ABCMeta, abstractmethod
-from stevedore import driver, named
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from roast.utils import load_driver, load_extensions
+from roast.component.build_cache import BuildCache
+
+log = logging.getLogger(__name__)
 
 
 class ComponentFactory(metaclass=ABCMeta):
@@ -25,11 +32,8 @@ class TestSuiteFactory(ComponentFactory):
         super(TestSuiteFactory, self).__init__(config)
 
     def create_component(self, component_type):
-        ts_mgr = driver.DriverManager(
-            namespace="roast.component.testsuite",
-            name=component_type,
-            invoke_on_load=True,
-            invoke_args=(self.config,),
+        ts_mgr = load_driver(
+            "roast.component.testsuite", component_type, invoke_args=(self.config,)
         )
         return ts_mgr
 
@@ -41,12 +45,8 @@ class SystemFactory(ComponentFactory):
         super(SystemFactory, self).__init__(config)
 
     def create_component(self, component_types):
-        system_mgr = named.NamedExtensionManager(
-            namespace="roast.component.system",
-            names=component_types,
-            invoke_on_load=True,
-            invoke_args=(self.config,),
-            name_order=True,
+        system_mgr = load_extensions(
+            "roast.component.system", component_types, invoke_args=(self.config,)
         )
         return system_mgr
 
@@ -58,6 +58,8 @@ class Scenario:
         self.system = config.get("roast.system")
         self._ts_mgr = None
         self._system_mgr = None
+        self.build_timings = {}
+        self.critical_path = []
 
     @property
     def ts(self):
@@ -83,11 +85,109 @@ class Scenario:
     def build_component(self):
         build_result = {}
         if self.system is not None:
-            build_result.update(self._system_mgr.map(build_extensions, self.config))
+            build_result.update(self._build_systems())
         if self.testsuite is not None:
             build_result[self.testsuite] = self._ts_mgr.driver.build()
         return build_result
 
+    def _build_systems(self) -> dict:
+        """Builds system components as a dependency graph on a worker pool.
+
+        The pool size is taken from the roast.build_workers config option
+        (default 1). Components are built once all components they depend on
+        have been built; dependents of failed builds are skipped. With the
+        roast.build_cache config option, components declaring build outputs
+        are restored from a content-addressed cache under buildDir when
+        their configuration, inputs and dependencies are unchanged. Build
+        timings and the critical path are kept in build_timings and
+        critical_path.
+
+        Returns:
+            dict: Build results by component name.
+        """
+        exts = {ext.name: ext for ext in self._system_mgr}
+        order = list(exts)
+        deps = {}
+        for name, ext in exts.items():
+            deps[name] = [d for d in getattr(ext.obj, "depends_on", []) if d in exts]
+            for dep in set(getattr(ext.obj, "depends_on", [])) - set(exts):
+                log.warning(f"{name} depends on {dep} which is not in roast.system")
+        _check_acyclic(deps)
+
+        workers = int(self.config.get("roast.build_workers", 1))
+        start = time.monotonic()
+        timings, results, failed = {}, {}, set()
+        pending = dict(deps)
+        running = {}
+
+        cache = None
+        if self.config.get("roast.build_cache", False):
+            cache = BuildCache(os.path.join(self.config["buildDir"], ".build_cache"))
+        keys = {}
+
+        def _build(name):
+            begin = time.monotonic() - start
+            obj = exts[name].obj
+            outputs = obj.build_outputs() if cache else []
+            # Dependents of components built without the cache are rebuilt
+            if outputs and all(d in keys for d in deps[name]):
+                try:
+                    subtree = self.config[name]
+                except KeyError:
+                    subtree = None
+                keys[name] = cache.key(
+                    name,
+                    subtree,
+                    obj.build_inputs(),
+                    [keys[d] for d in deps[name]],
+                )
+                hit, result = cache.fetch(keys[name])
+                if hit:
+                    log.info(f"Restored {name} from build cache")
+                    return result, begin, time.monotonic() - start, True
+            result = obj.build()
+            if name in keys:
+                cache.store(keys[name], result, obj.build_outputs())
+            return result, begin, time.monotonic() - start, False
+
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            while pending or running:
+                for name in order:
+                    if name not in pending:
+                        continue
+                    if any(d in failed for d in pending[name]):
+                        log.error(f"Skipping build of {name}, a dependency failed")
+                        failed.add(name)
+                        del pending[name]
+                    elif all(d in results for d in pending[name]):
+                        del pending[name]
+                        running[executor.submit(_build, name)] = name
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name], begin, end, cached = future.result()
+                        timings[name] = {
+                            "start": begin,
+                            "end": end,
+                            "duration": end - begin,
+                            "cached": cached,
+                        }
+                    except Exception:
+                        log.exception(f"Build of {name} failed")
+                        failed.add(name)
+
+        self.build_timings = timings
+        self.critical_path = _critical_path(deps, timings)
+        if self.critical_path:
+            path = " -> ".join(
+                f"{n} ({timings[n]['duration']:.1f}s)" for n in self.critical_path
+            )
+            log.info(f"Build critical path: {path}")
+        return {name: results[name] for name in order if name in results}
+
     def deploy_component(self):
         deploy_result = {}
         deploy_result[self.testsuite] = self._ts_mgr.driver.deploy()
@@ -112,3 +212,35 @@ def configure_extensions(ext, config):
 
 def build_extensions(ext, config):
     return (ext.name, ext.obj.build())
+
+
+def _check_acyclic(deps: dict) -> None:
+    visited, stack = set(), set()
+
+    def _visit(name):
+        if name in stack:
+            raise ValueError(f"Dependency cycle through system component {name}")
+        if name not in visited:
+            stack.add(name)
+            for dep in deps[name]:
+                _visit(dep)
+            stack.remove(name)
+            visited.add(name)
+
+    for name in deps:
+        _visit(name)
+
+
+def _critical_path(deps: dict, timings: dict) -> list:
+    """Chain of builds which determined the overall build time."""
+    if not timings:
+        return []
+    name = max(timings, key=lambda n: timings[n]["end"])
+    path = [name]
+    while True:
+        built = [d for d in deps[name] if d in timings]
+        if not built:
+            break
+        name = max(built, key=lambda n: timings[n]["end"])
+        path.append(name)
+    return path[::-1]
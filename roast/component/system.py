@@ -7,7 +7,14 @@ from abc import ABCMeta, abstractmethod
 
 
 class SystemBase(metaclass=ABCMeta):
-    """Base class for System component plugins"""
+    """Base class for System component plugins
+
+    depends_on lists the names of system components whose build has to
+    complete before this component is built. Components declaring their
+    build outputs can be restored from the build cache.
+    """
+
+    depends_on = []
 
     def __init__(self, config):
         self.config = config
@@ -19,3 +26,11 @@ class SystemBase(metaclass=ABCMeta):
     @abstractmethod
     def build(self):
         """Abstract class method to build the System component"""
+
+    def build_inputs(self):
+        """Files or directories the build depends on besides its configuration"""
+        return []
+
+    def build_outputs(self):
+        """Files or directories produced by the build, empty if not cacheable"""
+        return []
@@ -0,0 +1,187 @@
+#
+# Copyright (c) 2020 Xilinx, Inc. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+
+"""
+In-band file transfer over a shell console for targets without network.
+"""
+
+import time
+import base64
+import hashlib
+import logging
+from roast.exceptions import ExpectError
+from roast.utils import transfer_metrics
+
+log = logging.getLogger(__name__)
+
+# Canonical tty input lines are limited to 4095 characters, leave room for
+# the shell command wrapped around the base64 payload.
+MAX_CHUNK_SIZE = 2816
+
+
+def _md5(data: bytes) -> str:
+    return hashlib.md5(data).hexdigest()
+
+
+def _query(console, cmd: str, pattern: str, timeout: int) -> str:
+    console.sendline(cmd)
+    console.expect(expected=pattern, wait_for_prompt=False, timeout=timeout)
+    value = console.terminal.match.group(1)
+    console.expect(timeout=timeout)
+    return value
+
+
+def _chunk_cmd(index: int, data: bytes, dest: str, chunk_size: int) -> str:
+    payload = base64.b64encode(data).decode("ascii")
+    tmp = "/tmp/.roast_chunk"
+    # $((n)) keeps the echoed command from matching the ACK/NAK patterns
+    return (
+        f"echo {payload} | base64 -d > {tmp} && "
+        f'[ "$(md5sum < {tmp} | cut -c1-32)" = "{_md5(data)}" ] && '
+        f"dd if={tmp} of={dest} bs={chunk_size} seek={index} conv=notrunc 2>/dev/null "
+        f'&& echo "ACK:$(({index}))" || echo "NAK:$(({index}))"'
+    )
+
+
+def console_put(
+    console,
+    src_file: str,
+    dest_file: str,
+    chunk_size: int = 1024,
+    window: int = 2,
+    resume: bool = True,
+    retries: int = 3,
+    timeout: int = 60,
+) -> dict:
+    """Transfers a file to the target through its shell console.
+
+    The file is streamed in base64 encoded chunks, each verified with a md5
+    checksum on the target and written in place with dd. Up to window chunks
+    are in flight before an acknowledgement is awaited; keep
+    chunk_size * window * 4 / 3 below the 4 KiB tty input buffer of serial
+    consoles. With resume enabled an existing partial destination file is
+    verified and the transfer continues from its last complete chunk, a
+    destination longer than the source is truncated to its size.
+
+    Args:
+        console: Xexpect console logged in to the target.
+        src_file: Path to file on host.
+        dest_file: Path to file on target.
+        chunk_size: Payload bytes per chunk. Defaults to 1024.
+        window: Number of unacknowledged chunks in flight. Defaults to 2.
+        resume: Continue a previous partial transfer. Defaults to True.
+        retries: Retransmissions allowed per chunk. Defaults to 3.
+        timeout: Timeout for each acknowledgement. Defaults to 60.
+
+    Returns:
+        dict: Transfer statistics with size, sent bytes, resume offset,
+        retransmissions, duration and throughput in bytes per second.
+
+    Raises:
+        ValueError: When chunk_size exceeds the console line limit.
+        ExpectError: When a chunk fails verification after all retries or
+            the final file checksum does not match.
+    """
+    if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+        raise ValueError(f"chunk_size must be between 1 and {MAX_CHUNK_SIZE}")
+
+    with open(src_file, "rb") as fd:
+        data = fd.read()
+    size = len(data)
+    num_chunks = (size + chunk_size - 1) // chunk_size
+
+    with transfer_metrics("console", target=console.ip, files=1, bytes=size) as event:
+        start = time.monotonic()
+        offset = 0
+        if resume:
+            remote_size = int(
+                _query(
+                    console,
+                    f'echo "SIZE:$(wc -c < {dest_file} 2>/dev/null || echo 0)"',
+                    r"SIZE:\s*(\d+)",
+                    timeout,
+                )
+            )
+            offset = (min(remote_size, size) // chunk_size) * chunk_size
+            if offset:
+                remote_md5 = _query(
+                    console,
+                    f'echo "MD5:$(head -c {offset} {dest_file} | md5sum | cut -c1-32)"',
+                    r"MD5:([0-9a-f]{32})",
+                    timeout,
+                )
+                if remote_md5 != _md5(data[:offset]):
+                    log.info(f"Partial {dest_file} does not match, restarting transfer")
+                    offset = 0
+        if not offset:
+            console.runcmd(f": > {dest_file}", timeout=timeout)
+        else:
+            # dd conv=notrunc keeps whatever lies past the source size
+            if remote_size > size:
+                console.runcmd(f"truncate -s {size} {dest_file}", timeout=timeout)
+            log.info(f"Resuming transfer of {src_file} at offset {offset}")
+
+        stats = {
+            "size": size,
+            "sent_bytes": 0,
+            "resumed_from": offset,
+            "retransmissions": 0,
+        }
+        attempts = {}
+        pending = list(range(offset // chunk_size, num_chunks))
+        in_flight = []
+
+        def _send(index):
+            chunk = data[index * chunk_size : (index + 1) * chunk_size]
+            console.sendline(_chunk_cmd(index, chunk, dest_file, chunk_size))
+            stats["sent_bytes"] += len(chunk)
+            in_flight.append(index)
+
+        # Echoing every payload back doubles the console traffic
+        console.runcmd("stty -echo", timeout=timeout)
+        try:
+            while pending or in_flight:
+                while pending and len(in_flight) < window:
+                    _send(pending.pop(0))
+                ret = console.expect(
+                    expected=[r"ACK:(\d+)", r"NAK:(\d+)"],
+                    wait_for_prompt=False,
+                    timeout=timeout,
+                )
+                index = int(console.terminal.match.group(1))
+                if index in in_flight:
+                    in_flight.remove(index)
+                if ret == 1:
+                    attempts[index] = attempts.get(index, 0) + 1
+                    if attempts[index] > retries:
+                        raise ExpectError(
+                            f"Chunk {index} of {src_file} failed verification"
+                        )
+                    stats["retransmissions"] += 1
+                    event["retries"] += 1
+                    pending.insert(0, index)
+            console.sync()
+        finally:
+            console.runcmd("stty echo", timeout=timeout)
+
+        remote_md5 = _query(
+            console,
+            f'echo "MD5:$(md5sum < {dest_file} | cut -c1-32)"',
+            r"MD5:([0-9a-f]{32})",
+            timeout,
+        )
+        if remote_md5 != _md5(data):
+            raise ExpectError(f"Checksum mismatch after transferring {src_file}")
+        event["bytes"] = stats["sent_bytes"]
+
+    duration = time.monotonic() - start
+    stats["duration"] = duration
+    stats["throughput"] = stats["sent_bytes"] / duration if duration else 0.0
+    log.info(
+        f"Transferred {src_file} to {dest_file}: {stats['sent_bytes']} bytes in "
+        f"{duration:.2f}s ({stats['throughput'] / 1024:.1f} KiB/s), "
+        f"{stats['retransmissions']} retransmissions"
+    )
+    return stats
@@ -54,3 +54,9 @@ class RandomizerError(RoastError):
     """
     Raised when Randomizer failed data generation.
     """
+
+
+class FleetError(RoastError):
+    """
+    Raised when a quorum of boards could not be started.
+    """
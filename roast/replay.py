@@ -0,0 +1,195 @@
+#
+# Copyright (c) 2020 Xilinx, Inc. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+
+"""
+Record console sessions to a compact file and replay them through Xexpect
+without a live board.
+"""
+
+import os
+import time
+import gzip
+import json
+import logging
+from typing import Optional
+from pexpect import EOF, TIMEOUT
+from pexpect.spawnbase import SpawnBase
+
+log = logging.getLogger(__name__)
+
+SESSION_VERSION = 1
+
+
+class _Tap:
+    """File-like object forwarding one stream direction to the recorder."""
+
+    def __init__(self, recorder, direction):
+        self.recorder = recorder
+        self.direction = direction
+
+    def write(self, data):
+        self.recorder.write_event(self.direction, data)
+
+    def flush(self):
+        pass
+
+
+class SessionRecorder:
+    """Records sent lines and received data of a console with timestamps.
+
+    The session is stored as gzip compressed JSON lines. The first line is a
+    header holding hostname and prompt, every following line is an event of
+    the form ``[seconds_since_start, "s" | "r", data]``.
+
+    Args:
+        path (str): Session file to be written.
+        hostname (str): Hostname of the recorded console. Defaults to "".
+        prompt (str): Prompt of the recorded console. Defaults to None.
+    """
+
+    def __init__(self, path: str, hostname: str = "", prompt: Optional[str] = None):
+        self.path = path
+        self.events = 0
+        self.read_tap = _Tap(self, "r")
+        self.send_tap = _Tap(self, "s")
+        self._start = time.monotonic()
+        self._fd = gzip.open(path, "wt", encoding="utf-8")
+        header = {"version": SESSION_VERSION, "hostname": hostname, "prompt": prompt}
+        self._fd.write(json.dumps(header) + "\n")
+
+    def write_event(self, direction: str, data) -> None:
+        if self._fd is None or not data:
+            return
+        if isinstance(data, bytes):
+            data = data.decode("utf-8", errors="replace")
+        t = round(time.monotonic() - self._start, 6)
+        self._fd.write(json.dumps([t, direction, data]) + "\n")
+        self.events += 1
+
+    def close(self) -> None:
+        if self._fd is not None:
+            self._fd.close()
+            self._fd = None
+            log.info(f"Recorded {self.events} console events to {self.path}")
+
+
+def load_session(path: str):
+    """Reads a recorded session file.
+
+    Args:
+        path (str): Session file written by SessionRecorder.
+
+    Returns:
+        tuple: Header dictionary and list of events.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as fd:
+        header = json.loads(fd.readline())
+        events = [json.loads(line) for line in fd if line.strip()]
+    if header.get("version") != SESSION_VERSION:
+        raise ValueError(f"Unsupported session file version in {path}")
+    return header, events
+
+
+class ReplaySpawn(SpawnBase):
+    """pexpect compatible transport that plays back a recorded session.
+
+    Received data recorded after a send is only released once the same
+    number of lines have been sent to the replay, so expect sequences see
+    the stream in the recorded order. Timing between events is scaled by
+    speed; a speed of 0 replays as fast as possible.
+
+    Args:
+        path (str): Session file written by SessionRecorder.
+        speed (float): Replay speed factor. Defaults to 1.0.
+        timeout (int): Default pexpect timeout. Defaults to 30.
+    """
+
+    def __init__(self, path: str, speed: float = 1.0, timeout: int = 30):
+        super().__init__(timeout=timeout, encoding="utf-8", codec_errors="replace")
+        self.header, self.events = load_session(path)
+        self.recorded_sends = [
+            data for _, direction, data in self.events if direction == "s"
+        ]
+        self.speed = speed
+        self.child_fd = -1
+        self.closed = False
+        self.mismatches = 0
+        self._idx = 0
+        self._pending = ""
+        self._sends = 0
+        self._sends_played = 0
+        self._last_t = 0.0
+        self._due = None
+
+    def _next_event(self):
+        # Skip recorded sends already performed by the caller
+        while self._idx < len(self.events):
+            t, direction, data = self.events[self._idx]
+            if direction == "r":
+                return self.events[self._idx]
+            if self._sends_played >= self._sends:
+                return self.events[self._idx]
+            self._sends_played += 1
+            self._last_t = t
+            self._due = None
+            self._idx += 1
+        return None
+
+    def read_nonblocking(self, size=1, timeout=-1):
+        if timeout == -1:
+            timeout = self.timeout
+
+        if not self._pending:
+            event = self._next_event()
+            if event is None:
+                self.flag_eof = True
+                raise EOF("End of recorded session")
+            t, direction, data = event
+            if direction == "s":
+                # Recorded output depends on a line not sent yet
+                raise TIMEOUT("Replay waiting for send")
+
+            if self.speed:
+                if self._due is None:
+                    self._due = time.monotonic() + (t - self._last_t) / self.speed
+                delay = self._due - time.monotonic()
+                if timeout is not None and delay > timeout:
+                    time.sleep(max(timeout, 0))
+                    raise TIMEOUT("Timeout exceeded.")
+                if delay > 0:
+                    time.sleep(delay)
+            self._last_t = t
+            self._due = None
+            self._idx += 1
+            self._pending = data
+
+        s, self._pending = self._pending[:size], self._pending[size:]
+        self._log(s, "read")
+        return s
+
+    def send(self, s):
+        s = self._coerce_send_string(s)
+        self._log(s, "send")
+        recorded = self.recorded_sends
+        if self._sends < len(recorded) and recorded[self._sends] != s:
+            self.mismatches += 1
+            log.warning(
+                f"Replay send mismatch: recorded {recorded[self._sends]!r}, got {s!r}"
+            )
+        self._sends += 1
+        return len(s)
+
+    def sendline(self, s=""):
+        return self.send(s + os.linesep)
+
+    def sendcontrol(self, char):
+        char = char.lower()
+        return self.send(chr(ord(char) - ord("a") + 1))
+
+    def isalive(self):
+        return not self.flag_eof
+
+    def close(self, force=True):
+        self.closed = True
@@ -3,23 +3,27 @@
 # SPDX-License-Identifier: MIT
 #
 
+import os
+import gzip
+import time
+import queue
+import shutil
 import logging
 import atexit
+import threading
+from datetime import datetime
 from roast.xexpect import Xexpect
+from roast.boot_profile import BootProfiler
 from abc import ABCMeta, abstractmethod
-from stevedore import driver
+from roast.utils import load_driver
 
 log = logging.getLogger(__name__)
 
 
 class Serial:
     def __init__(self, serial_type: str, config, **kwargs) -> None:
-        self._serial_mgr = driver.DriverManager(
-            namespace="roast.serial",
-            name=serial_type,
-            invoke_on_load=True,
-            invoke_args=(config,),
-            invoke_kwds=kwargs,
+        self._serial_mgr = load_driver(
+            "roast.serial", serial_type, invoke_args=(config,), invoke_kwds=kwargs
         )
 
     @property
@@ -27,30 +31,162 @@ class Serial:
         return self._serial_mgr.driver
 
     def exit(self) -> None:
-        self.driver.exit()
+        self.driver.stop_capture()
+        if self.driver.is_live:
+            self.driver.exit()
+
+
+class SerialCapture:
+    """Writes console output with timestamps to size rotated files.
+
+    Data is queued by write() and stored by a background writer thread, so
+    the console reader is not slowed down by file I/O. Every line is
+    prefixed with its arrival time. When the file reaches max_bytes it is
+    rotated to file.1 .. file.<backup_count>, optionally gzip compressed.
+
+    Args:
+        file_path (str): Capture file.
+        max_bytes (int): Size at which the file is rotated. Defaults to 64 MiB.
+        backup_count (int): Number of rotated files kept. Defaults to 5.
+        compress (bool): Gzip rotated files. Defaults to False.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        max_bytes: int = 64 * 2**20,
+        backup_count: int = 5,
+        compress: bool = False,
+    ) -> None:
+        self.file_path = file_path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compress = compress
+        self.bytes = 0
+        self.lines = 0
+        self.rotations = 0
+        self._queue = queue.Queue()
+        self._fd = open(file_path, "ab")
+        self._thread = threading.Thread(
+            target=self._run, name=f"capture-{file_path}", daemon=True
+        )
+        self._thread.start()
+        # The daemon writer would drop queued data at interpreter exit
+        atexit.register(self.close)
+
+    def write(self, data) -> None:
+        self._queue.put((time.time(), data))
+
+    def flush(self) -> None:
+        pass
+
+    def _backup(self, n: int) -> str:
+        return f"{self.file_path}.{n}" + (".gz" if self.compress else "")
+
+    def _rotate(self) -> None:
+        self._fd.close()
+        for n in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(self._backup(n)):
+                os.replace(self._backup(n), self._backup(n + 1))
+        if self.backup_count > 0:
+            if self.compress:
+                with open(self.file_path, "rb") as src, gzip.open(
+                    self._backup(1), "wb"
+                ) as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(self.file_path)
+            else:
+                os.replace(self.file_path, self._backup(1))
+        self._fd = open(self.file_path, "wb")
+        self.rotations += 1
+
+    def _run(self) -> None:
+        line_start = True
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            ts, data = item
+            if isinstance(data, bytes):
+                data = data.decode("utf-8", errors="replace")
+            stamp = datetime.fromtimestamp(ts).strftime("[%H:%M:%S.%f] ").encode()
+            out = bytearray()
+            for piece in data.splitlines(keepends=True):
+                if line_start:
+                    out += stamp
+                encoded = piece.encode("utf-8")
+                out += encoded
+                self.bytes += len(encoded)
+                line_start = piece.endswith("\n")
+            self._fd.write(out)
+            self.lines += data.count("\n")
+            if self._fd.tell() >= self.max_bytes:
+                self._rotate()
+        self._fd.close()
+
+    def close(self) -> None:
+        """Flushes queued data, closes the file and logs a summary."""
+        atexit.unregister(self.close)
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+            log.info(
+                f"Captured {self.lines} lines ({self.bytes} bytes) to "
+                f"{self.file_path}, {self.rotations} rotations"
+            )
 
 
 class SerialBase(metaclass=ABCMeta):
+    """Base class of serial console drivers.
+
+    With the "serial_lazy_connect" config option set, the console is
+    opened on first use of the console or its methods instead of on
+    construction.
+    """
+
+    # Console methods bound as attributes on connect
+    _console_methods = (
+        "expect",
+        "sendline",
+        "runcmd",
+        "runcmd_list",
+        "sendcontrol",
+        "send",
+        "output",
+        "_setup_init",
+        "search",
+        "sync",
+        "put_file",
+    )
+
     def __init__(self, config) -> None:
         self.config = config
         self.hostname = ""
         self.is_live = False
         self._configure()
+        if not config.get("serial_lazy_connect", False):
+            self.connect()
+
+    def connect(self) -> None:
+        """Opens the console and connects to the serial port if not done yet."""
+        if self.is_live:
+            return
         self.console = Xexpect(log, hostname=self.hostname, non_interactive=False)
-        self.expect = self.console.expect
-        self.sendline = self.console.sendline
-        self.runcmd = self.console.runcmd
-        self.runcmd_list = self.console.runcmd_list
-        self.sendcontrol = self.console.sendcontrol
-        self.send = self.console.send
-        self.output = self.console.output
-        self._setup_init = self.console._setup_init
-        self.search = self.console.search
-        self.sync = self.console.sync
+        for name in self._console_methods:
+            setattr(self, name, getattr(self.console, name))
         atexit.register(self.exit)
         self._connect()
         self.is_live = True
 
+    def __getattr__(self, name):
+        # Only reached while the console attributes are not bound yet
+        if name == "console" or name in self._console_methods:
+            self.connect()
+            return self.__dict__[name]
+        raise AttributeError(
+            f"'{type(self).__name__}' object has no attribute '{name}'"
+        )
+
     def _configure(self) -> None:
         """Set hostname."""
 
@@ -62,6 +198,48 @@ class SerialBase(metaclass=ABCMeta):
     def exit(self) -> None:
         """Release connection."""
 
+    def start_capture(self, file_path: str, **kwargs) -> SerialCapture:
+        """Streams console output to rotating capture files instead of the debug log.
+
+        Args:
+            file_path (str): Capture file.
+            kwargs: Options passed to SerialCapture.
+
+        Returns:
+            SerialCapture instance.
+        """
+        self.stop_capture()
+        self.capture = SerialCapture(file_path, **kwargs)
+        self.console.add_reader(self.capture)
+        # Line by line debug logging is what the capture replaces
+        self._capture_logfile = self.console.terminal.logfile
+        self.console.terminal.logfile = None
+        return self.capture
+
+    def stop_capture(self) -> None:
+        """Stops the capture and restores console debug logging."""
+        capture = getattr(self, "capture", None)
+        if capture is not None:
+            self.console.remove_reader(capture)
+            self.console.terminal.logfile = self._capture_logfile
+            capture.close()
+            self.capture = None
+
+    def profile_boot(self, milestones=None, **kwargs) -> BootProfiler:
+        """Starts timestamping boot milestones read on this console.
+
+        Call before powering or resetting the board; the profiler is
+        detached with its detach() method.
+
+        Args:
+            milestones (list): (name, regex) pairs. Defaults to BootProfiler's.
+            kwargs: Options passed to BootProfiler.
+
+        Returns:
+            BootProfiler instance.
+        """
+        return BootProfiler(milestones, **kwargs).attach(self.console)
+
     @property
     def prompt(self):
         return self.console.prompt
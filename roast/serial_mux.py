@@ -0,0 +1,236 @@
+#
+# Copyright (c) 2020 Xilinx, Inc. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+
+"""
+Share one serial console between several readers.
+"""
+
+import atexit
+import logging
+import threading
+from collections import deque
+from typing import Optional
+from pexpect import EOF, TIMEOUT
+from pexpect.spawnbase import SpawnBase
+from roast.xexpect import Xexpect
+
+log = logging.getLogger(__name__)
+
+
+class MuxSpawn(SpawnBase):
+    """pexpect compatible subscriber of a SerialMux.
+
+    Reads consume the shared stream from the subscriber's own cursor, sends
+    go to the serial port.
+
+    Args:
+        mux (SerialMux): Multiplexer owning the port.
+        cursor (int): Stream offset to start reading from.
+        timeout (int): Default pexpect timeout. Defaults to 30.
+    """
+
+    def __init__(self, mux, cursor: int, timeout: int = 30):
+        port = mux.port
+        super().__init__(
+            timeout=timeout,
+            encoding=getattr(port, "encoding", None),
+            codec_errors=getattr(port, "codec_errors", "strict"),
+        )
+        self.mux = mux
+        self.cursor = cursor
+        self.dropped = 0
+        self.child_fd = -1
+        self.closed = False
+
+    def read_nonblocking(self, size=1, timeout=-1):
+        if timeout == -1:
+            timeout = self.timeout
+        s = self.mux._read(self, size, timeout)
+        if s is None:
+            raise TIMEOUT("Timeout exceeded.")
+        if not s:
+            self.flag_eof = True
+            raise EOF("Serial port closed")
+        self._log(s, "read")
+        return s
+
+    def send(self, s):
+        s = self._coerce_send_string(s)
+        self._log(s, "send")
+        return self.mux.port.send(s)
+
+    def sendline(self, s=""):
+        return self.send(self._coerce_send_string(s) + self.linesep)
+
+    def sendcontrol(self, char):
+        char = char.lower()
+        return self.send(chr(ord(char) - ord("a") + 1))
+
+    def isalive(self):
+        return not self.flag_eof and self.mux.port.isalive()
+
+    def close(self, force=True):
+        self.mux.unsubscribe(self)
+        self.closed = True
+
+
+class SerialMux:
+    """Owns a serial console once and fans its output out to subscribers.
+
+    A pump thread reads the port of a serial driver into a bounded buffer
+    of chunks shared by all subscribers, each reading from its own cursor.
+    Chunks are stored once however many subscribers there are; when the
+    buffer exceeds max_bytes the oldest chunks are dropped and subscribers
+    lagging behind skip ahead, counting the lost data in their dropped
+    attribute. The driver's console keeps working on top of the first
+    subscriber, so tests are unaffected by monitors reading along.
+
+    Args:
+        serial: Serial facade or SerialBase driver.
+        max_bytes (int): Buffered stream size. Defaults to 4 MiB.
+        read_size (int): Maximum size of a port read. Defaults to 4096.
+        poll (float): Port read timeout of the pump in seconds. Defaults to 0.1.
+    """
+
+    def __init__(
+        self,
+        serial,
+        max_bytes: int = 4 * 2**20,
+        read_size: int = 4096,
+        poll: float = 0.1,
+    ) -> None:
+        self.serial = getattr(serial, "driver", serial)
+        self.console = self.serial.console
+        self.port = self.console.terminal
+        self.max_bytes = max_bytes
+        self.read_size = read_size
+        self.poll = poll
+        self.subscribers = []
+        self._chunks = deque()
+        self._base = 0  # Stream offset of the first buffered chunk
+        self._end = 0  # Stream offset after the last buffered chunk
+        self._eof = False
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+
+        # Logging moves to the subscriber taking the port's place
+        self.primary = self.subscribe(timeout=self.port.timeout)
+        self.primary.logfile = self.port.logfile
+        self.port.logfile = self.port.logfile_read = self.port.logfile_send = None
+        self.console.terminal = self.primary
+        self.console._install_readers()
+
+        self._thread = threading.Thread(
+            target=self._pump, name=f"serial-mux-{self.console.ip}", daemon=True
+        )
+        self._thread.start()
+
+    def _pump(self) -> None:
+        while not self._stop.is_set():
+            try:
+                data = self.port.read_nonblocking(self.read_size, timeout=self.poll)
+            except TIMEOUT:
+                continue
+            except EOF:
+                break
+            with self._cond:
+                self._chunks.append(data)
+                self._end += len(data)
+                while self._end - self._base > self.max_bytes and len(self._chunks) > 1:
+                    self._base += len(self._chunks.popleft())
+                self._cond.notify_all()
+        with self._cond:
+            self._eof = True
+            self._cond.notify_all()
+
+    def _read(self, sub: MuxSpawn, size: int, timeout: Optional[float]):
+        """Returns up to size of data at a subscriber's cursor.
+
+        Returns None on timeout and empty data at end of stream.
+        """
+        with self._cond:
+            if not self._cond.wait_for(
+                lambda: sub.cursor < self._end or self._eof, timeout
+            ):
+                return None
+            if sub.cursor >= self._end:
+                return self.port.string_type()
+            if sub.cursor < self._base:
+                sub.dropped += self._base - sub.cursor
+                log.warning(
+                    f"Serial mux subscriber lost {self._base - sub.cursor} bytes"
+                )
+                sub.cursor = self._base
+            # Subscribers usually read near the end, search from there
+            start = self._end
+            for index in range(len(self._chunks) - 1, -1, -1):
+                start -= len(self._chunks[index])
+                if start <= sub.cursor:
+                    break
+            pieces = []
+            offset = sub.cursor - start
+            while size > 0 and index < len(self._chunks):
+                piece = self._chunks[index][offset : offset + size]
+                pieces.append(piece)
+                size -= len(piece)
+                offset = 0
+                index += 1
+            data = self.port.string_type().join(pieces)
+            sub.cursor += len(data)
+            return data
+
+    def subscribe(self, from_start: bool = False, timeout: int = 30) -> MuxSpawn:
+        """Adds a subscriber of the console stream.
+
+        Args:
+            from_start (bool): Start at the oldest buffered data instead of
+                new data. Defaults to False.
+            timeout (int): Default pexpect timeout. Defaults to 30.
+
+        Returns:
+            MuxSpawn instance.
+        """
+        with self._cond:
+            sub = MuxSpawn(self, self._base if from_start else self._end, timeout)
+            self.subscribers.append(sub)
+        return sub
+
+    def unsubscribe(self, sub: MuxSpawn) -> None:
+        """Removes a subscriber added with subscribe()."""
+        with self._cond:
+            if sub in self.subscribers:
+                self.subscribers.remove(sub)
+
+    def open_console(self, log: logging.Logger = log, **kwargs) -> Xexpect:
+        """Returns an Xexpect console reading the stream as a new subscriber.
+
+        Args:
+            log (logging.Logger): Logger of the console. Defaults to this module's.
+            kwargs: Options passed to subscribe().
+
+        Returns:
+            Xexpect instance sharing the serial port.
+        """
+        console = Xexpect(
+            log,
+            hostname=self.console.hostname,
+            non_interactive=False,
+            terminal=self.subscribe(**kwargs),
+        )
+        console.prompt = self.console.prompt
+        # The driver's console owns the session and exits it
+        atexit.unregister(console.exit)
+        return console
+
+    def close(self) -> None:
+        """Stops the pump and hands the port back to the driver's console."""
+        self._stop.set()
+        self._thread.join()
+        if self.console.terminal is self.primary:
+            self.port.logfile = self.primary.logfile
+            self.console.terminal = self.port
+            self.console._install_readers()
+        for sub in list(self.subscribers):
+            sub.close()
@@ -10,16 +10,71 @@ This lib was implemented with api calls to acquire host & target instances, scp
 import os
 import sys
 import time
+import glob
+import posixpath
+import tarfile
+import subprocess
+import threading
 import pexpect
 from pexpect import pxssh
 import re
 import socket
 import logging
-from typing import Optional
-from roast.utils import convert_list, FileAdapter
+from typing import Optional, List
+from roast.utils import (
+    convert_list,
+    FileAdapter,
+    HashCache,
+    transfer_metrics,
+    emit_event,
+    partition_shards,
+)
+from roast.exceptions import ExpectError
 
 log = logging.getLogger(__name__)
 
+SCP_FAILURES = [
+    "lost connection",
+    "Name or service not known",
+    "Name or service not known",
+    "Permission denied",
+    "No such file or directory",
+    "No route to host",
+    "Network is unreachable",
+    "No space left on device",
+]
+
+
+def _ssh_opts(proxy_server: Optional[str] = None) -> str:
+    opts = "-o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null "
+    if proxy_server:
+        proxy_cmd = f'-o "ProxyCommand ssh {proxy_server} -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null -W %h:%p" '
+        opts += proxy_cmd
+    return opts
+
+
+def _scp_cmd(proxy_server: Optional[str] = None) -> str:
+    return f"scp -r -q {_ssh_opts(proxy_server)}"
+
+
+# tarfile stream mode suffix and matching tar extract flag on target
+TAR_COMPRESSION = {
+    None: ("", ""),
+    "gz": ("gz", "z"),
+    "bz2": ("bz2", "j"),
+    "xz": ("xz", "J"),
+}
+
+
+def _path_size(path: str) -> int:
+    if os.path.isdir(path):
+        return sum(
+            os.path.getsize(os.path.join(root, f))
+            for root, _, files in os.walk(path)
+            for f in files
+        )
+    return os.path.getsize(path)
+
 
 def scp_file_transfer(
     self,
@@ -32,6 +87,9 @@ def scp_file_transfer(
     user: str = "root",
     password: str = "root",
     timeout: int = 3000,
+    tar_threshold: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    tar_compression: Optional[str] = None,
 ) -> None:
     """Securely transfers file between host and target.
 
@@ -45,17 +103,88 @@ def scp_file_transfer(
         user: Username used for login. Defaults to "root".
         password: Password user for login. Defaults to "root".
         timeout: Time for expected output. Defaults to 3000.
+        tar_threshold: Stream a directory holding at least this many files as a tar archive over ssh, falling back to scp on failure. Defaults to None.
+        max_workers: Send the files with up to this many concurrent scp using scp_parallel_transfer, falling back to a single scp with password login. Defaults to None.
+        tar_compression: Compress the tar stream with "gz", "bz2" or "xz". Defaults to None.
 
     Raises:
         ConnectionError: When files fail to be transferred in within the timeout window.
+        ValueError: When tar_compression is not supported.
     """
     if not images:
         images = f"{self.config['images']}/*"
+    if tar_compression not in TAR_COMPRESSION:
+        raise ValueError(f"Unsupported tar compression {tar_compression}")
 
-    cmd = "scp -r -q -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null "
-    if proxy_server:
-        proxy_cmd = f'-o "ProxyCommand ssh {proxy_server} -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null -W %h:%p" '
-        cmd += proxy_cmd
+    if transfer_to_target and tar_threshold is not None:
+        if not target_path:
+            target_path = f"{self.config['target_path']}"
+        # "dir/*" sends the directory contents, "dir" the directory itself
+        if images.endswith("/*") and os.path.isdir(images[:-2]):
+            src_dir, dest_dir = images[:-2], target_path
+        elif os.path.isdir(images):
+            src_dir = images
+            dest_dir = posixpath.join(target_path, os.path.basename(images.rstrip("/")))
+        else:
+            src_dir = None
+        if src_dir and _file_count(src_dir) >= tar_threshold:
+            # Streamed from the console's host like scp, so password login
+            # and remote hosts work the same
+            flag = TAR_COMPRESSION[tar_compression][1]
+            cmd = (
+                f"tar -C {src_dir} -c{flag}f - . | ssh {_ssh_opts(proxy_server)}"
+                f"{user}@{target_ip} 'mkdir -p {dest_dir} && "
+                f"tar -x{flag}f - -C {dest_dir}'"
+            )
+            size = _path_size(src_dir)
+            try:
+                start = time.monotonic()
+                with transfer_metrics(
+                    "tar",
+                    target=target_ip,
+                    files=_file_count(src_dir),
+                    bytes=size,
+                ) as event:
+                    if not _console_transfer(
+                        self,
+                        cmd,
+                        password,
+                        timeout,
+                        f"Failed to stream {src_dir}",
+                        event,
+                    ):
+                        raise ConnectionError(f"Failed to stream {src_dir}")
+                duration = time.monotonic() - start
+                throughput = size / duration if duration else 0.0
+                log.info(
+                    f"tar stream {src_dir} to {dest_dir} successfully, {size} bytes "
+                    f"in {duration:.2f}s ({throughput / 2**20:.2f} MiB/s)"
+                )
+                return
+            except (ConnectionError, ExpectError, AssertionError) as e:
+                log.warning(f"tar stream of {src_dir} failed, falling back to scp: {e}")
+                self.sendcontrol("c")
+
+    if transfer_to_target and max_workers is not None and max_workers > 1:
+        try:
+            scp_parallel_transfer(
+                self,
+                images,
+                target_path,
+                target_ip,
+                proxy_server=proxy_server,
+                user=user,
+                timeout=timeout,
+                max_workers=max_workers,
+            )
+            return
+        except ConnectionError as e:
+            # Parallel lanes need key based login, scp answers password prompts
+            if not password or "Permission denied" not in str(e):
+                raise
+            log.warning(f"Parallel scp needs key based login, using scp: {e}")
+
+    cmd = _scp_cmd(proxy_server)
 
     # Send the file
     if transfer_to_target:
@@ -68,17 +197,35 @@ def scp_file_transfer(
             host_path = f"{self.config['host_path']}"
         cmd += f"{user}@{target_ip}:{images} {host_path}"
 
-    err = f"Failed to scp {images} to {target_path}"
-    expected_failures = [
-        "lost connection",
-        "Name or service not known",
-        "Name or service not known",
-        "Permission denied",
-        "No such file or directory",
-        "No route to host",
-        "Network is unreachable",
-        "No space left on device",
-    ]
+    files = []
+    if transfer_to_target:
+        files = [f for pattern in images.split() for f in glob.glob(pattern)]
+    with transfer_metrics(
+        "scp",
+        target=target_ip,
+        files=len(files),
+        bytes=sum(_path_size(f) for f in files),
+    ) as event:
+        if _console_transfer(
+            self,
+            cmd,
+            password,
+            timeout,
+            f"Failed to scp {images} to {target_path}",
+            event,
+        ):
+            log.info(f"scp {images} to {target_path} successfully")
+
+
+def _console_transfer(
+    self, cmd: str, password: str, timeout: int, err: str, event: dict
+) -> bool:
+    """Runs a transfer command on the console, answering login prompts.
+
+    Returns:
+        bool: True when the command completed with a zero return code.
+    """
+    expected_failures = list(SCP_FAILURES)
     expected = ["[Pp]assword", "Do you want to continue", self.hostname]
 
     if self.prompt:
@@ -101,14 +248,413 @@ def scp_file_transfer(
         elif index in (2, 3):
             return_code = self._exit_non_zero_return(cmd, custom_err="Failed to scp")
             if return_code != 0:
+                event["retries"] += 1
                 # Max re-tries exceeded
                 if n >= 4:
                     raise ConnectionError(err)
             else:
-                log.info(f"scp {images} to {target_path} successfully")
-                break
+                return True
         else:
             raise ConnectionError(err)
+    return False
+
+
+def _file_count(path: str) -> int:
+    return sum(len(files) for _, _, files in os.walk(path))
+
+
+class _CountingWriter:
+    """Write-only stream wrapper counting the bytes passed through."""
+
+    def __init__(self, fd):
+        self.fd = fd
+        self.count = 0
+
+    def write(self, data):
+        self.count += len(data)
+        return self.fd.write(data)
+
+    def flush(self):
+        self.fd.flush()
+
+
+def tar_stream_transfer(
+    src_dir: str,
+    target_path: str,
+    target_ip: str,
+    user: str = "root",
+    proxy_server: Optional[str] = None,
+    compression: Optional[str] = None,
+    timeout: int = 3000,
+) -> dict:
+    """Streams a directory to target as a tar archive over a single ssh channel.
+
+    The archive is generated on the fly with tarfile, optionally compressed
+    with gz, bz2 or xz, and unpacked into target_path by tar on target. This
+    avoids the per-file round trips of scp for trees with many small files.
+    ssh runs on the host running roast and key based authentication is
+    required as the channel carries data. Remote output is drained during
+    the transfer and timeout bounds the whole transfer.
+
+    Args:
+        src_dir: Directory on host whose contents are transferred.
+        target_path: Directory on target, created if missing.
+        target_ip: IP address of target.
+        user: Username used for login. Defaults to "root".
+        proxy_server: Address of proxy server. Defaults to None.
+        compression: None, "gz", "bz2" or "xz". Defaults to None.
+        timeout: Time allowed for the transfer. Defaults to 3000.
+
+    Returns:
+        dict: Number of files, archive bytes sent, duration and throughput.
+
+    Raises:
+        ValueError: When compression is not supported.
+        ConnectionError: When the remote extraction fails.
+    """
+    if compression not in TAR_COMPRESSION:
+        raise ValueError(f"Unsupported tar compression {compression}")
+    tar_mode, tar_flag = TAR_COMPRESSION[compression]
+
+    ssh_cmd = [
+        "ssh",
+        "-o",
+        "StrictHostKeyChecking=no",
+        "-o",
+        "UserKnownHostsFile=/dev/null",
+        "-o",
+        "BatchMode=yes",
+    ]
+    if proxy_server:
+        ssh_cmd += [
+            "-o",
+            f"ProxyCommand ssh {proxy_server} -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null -W %h:%p",
+        ]
+    ssh_cmd += [
+        f"{user}@{target_ip}",
+        f"mkdir -p {target_path} && tar -x{tar_flag}f - -C {target_path}",
+    ]
+
+    start = time.monotonic()
+    with transfer_metrics("tar", target=target_ip, files=_file_count(src_dir)) as event:
+        with subprocess.Popen(
+            ssh_cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        ) as proc:
+            stream = _CountingWriter(proc.stdin)
+            output, errors = [], []
+
+            def _write():
+                try:
+                    with tarfile.open(fileobj=stream, mode=f"w|{tar_mode}") as tar:
+                        for entry in sorted(os.listdir(src_dir)):
+                            tar.add(os.path.join(src_dir, entry), arcname=entry)
+                except BrokenPipeError:
+                    pass
+                except Exception as e:
+                    errors.append(e)
+                    proc.kill()
+                try:
+                    proc.stdin.close()
+                except BrokenPipeError:
+                    pass
+
+            # Remote output is drained while writing, a full pipe would
+            # otherwise block ssh and the writer with it
+            reader = threading.Thread(
+                target=lambda: output.append(proc.stdout.read()), daemon=True
+            )
+            writer = threading.Thread(target=_write, daemon=True)
+            reader.start()
+            writer.start()
+            writer.join(timeout)
+            try:
+                proc.wait(timeout=max(0, timeout - (time.monotonic() - start)))
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                writer.join()
+                raise ConnectionError(f"Timed out streaming {src_dir} to {target_ip}")
+            writer.join()
+            reader.join()
+        if errors:
+            raise errors[0]
+        event["bytes"] = stream.count
+        if proc.returncode != 0:
+            err = b"".join(output).decode("utf-8", errors="replace").strip()
+            raise ConnectionError(f"Failed to stream {src_dir} to {target_path}: {err}")
+
+    duration = time.monotonic() - start
+    stats = {
+        "files": _file_count(src_dir),
+        "bytes": stream.count,
+        "duration": duration,
+        "throughput": stream.count / duration if duration else 0.0,
+    }
+    log.info(
+        f"tar stream {src_dir} to {target_ip}:{target_path}: {stats['files']} files, "
+        f"{stats['bytes']} bytes in {duration:.2f}s "
+        f"({stats['throughput'] / 2**20:.2f} MiB/s)"
+    )
+    return stats
+
+
+def scp_parallel_transfer(
+    self,
+    images: Optional[str] = None,
+    target_path: Optional[str] = None,
+    target_ip: str = "",
+    proxy_server: Optional[str] = None,
+    user: str = "root",
+    timeout: int = 3000,
+    max_workers: int = 4,
+) -> dict:
+    """Transfers a set of image files to target over concurrent scp sessions.
+
+    The file set is listed with its sizes on the console's host and split
+    largest first into max_workers lanes. The lanes run as background jobs
+    of one foreground subshell on the console, so scp runs on the console's
+    host like in scp_file_transfer. Key based authentication is required,
+    as concurrent jobs can not answer password prompts. A file failing
+    without one of SCP_FAILURES is retried up to five times, any of
+    SCP_FAILURES stops the transfer.
+
+    Args:
+        images: Glob of image files to be transfered. Defaults to "{images}/*" from config.
+        target_path: Path on target. Defaults to target_path from config.
+        target_ip: IP address of target. Defaults to "".
+        proxy_server: Address of proxy server. Defaults to None.
+        user: Username used for login. Defaults to "root".
+        timeout: Time for expected output of the transfers. Defaults to 3000.
+        max_workers: Number of concurrent transfers. Defaults to 4.
+
+    Returns:
+        dict: Per file bytes, duration and throughput under "files", plus
+        aggregate "bytes", "duration" and "throughput".
+
+    Raises:
+        ConnectionError: When files fail to be transferred.
+    """
+    if not images:
+        images = f"{self.config['images']}/*"
+    if not target_path:
+        target_path = f"{self.config['target_path']}"
+
+    # Sources are resolved where scp runs
+    self.runcmd(f"du -sb {images} 2>/dev/null; true", timeout=timeout)
+    sizes = {}
+    for size, path in re.findall(r"^(\d+)\s+(\S+)\s*$", self.output(), re.M):
+        sizes.setdefault(path, int(size))
+    files = list(sizes)
+    if not files:
+        raise ConnectionError(f"Failed to scp {images}: No such file or directory")
+
+    scp = f"{_scp_cmd(proxy_server)}-o BatchMode=yes "
+    jobs = []
+    for lane in partition_shards(sizes, max_workers):
+        steps = [
+            f"s=$(date +%s%N); n=0; "
+            f"until {scp}{path} {user}@{target_ip}:{target_path} < /dev/null; "
+            f"do n=$((n+1)); [ $n -ge 5 ] && break; done; "
+            f'echo "scp_file={files.index(path)},$n,$s,$(date +%s%N)"'
+            for path in lane
+        ]
+        jobs.append(f"({'; '.join(steps)}) &")
+    # The subshell keeps the jobs in the foreground and stops them on an
+    # interrupt, $n and $? keep the echoed command from matching the
+    # result patterns
+    stop = "trap 'for p in $(jobs -p); do pkill -P $p; kill $p; done' INT;"
+    cmd = f"({stop} {' '.join(jobs)} wait); echo \"scp_done=$?\""
+
+    results = {}
+    failed = []
+    start = time.monotonic()
+    self.sync()
+    self.sendline(cmd)
+    while True:
+        try:
+            index = self.expect(
+                SCP_FAILURES,
+                [r"scp_file=(\d+),(\d+),(\d+),(\d+)", r"scp_done=\d+"],
+                wait_for_prompt=False,
+                err_index=len(SCP_FAILURES),
+                timeout=float(timeout),
+            )
+        except ExpectError as e:
+            # Stop the remaining lanes
+            self.sendcontrol("c")
+            self.expect(timeout=timeout)
+            raise ConnectionError(f"Failed to scp {images} to {target_path}: {e}")
+        if index == 0:
+            n, retries, begin, end = (int(g) for g in self.terminal.match.groups())
+            path, size = files[n], sizes[files[n]]
+            duration = (end - begin) / 1e9
+            throughput = size / duration if duration > 0 else 0.0
+            emit_event(
+                {
+                    "kind": "scp",
+                    "target": target_ip,
+                    "files": 1,
+                    "bytes": size,
+                    "retries": min(retries, 4),
+                    "status": "ok" if retries < 5 else "failed",
+                    "duration": duration,
+                }
+            )
+            if retries >= 5:
+                failed.append(path)
+                continue
+            log.info(
+                f"scp {path}: {size} bytes in {duration:.2f}s ({throughput / 2**20:.2f} MiB/s)"
+            )
+            results[path] = {
+                "bytes": size,
+                "duration": duration,
+                "throughput": throughput,
+            }
+        else:
+            break
+    self.expect(timeout=timeout)
+    if failed:
+        raise ConnectionError(f"Failed to scp {' '.join(failed)} to {target_path}")
+
+    duration = time.monotonic() - start
+    total = sum(r["bytes"] for r in results.values())
+    throughput = total / duration if duration else 0.0
+    log.info(
+        f"scp {len(files)} files to {target_path}: {total} bytes in {duration:.2f}s "
+        f"({throughput / 2**20:.2f} MiB/s)"
+    )
+    return {
+        "files": results,
+        "bytes": total,
+        "duration": duration,
+        "throughput": throughput,
+    }
+
+
+def target_hashes(
+    console,
+    paths: List[str],
+    hash_cmd: str = "md5sum",
+    timeout: int = 200,
+    max_cmd_len: int = 3000,
+) -> dict:
+    """Computes content hashes of files on target in batched commands.
+
+    Paths are packed into as few commands as the console line length
+    allows. Missing files are left out of the result.
+
+    Args:
+        console: Xexpect console on target.
+        paths: Target file paths.
+        hash_cmd: Hash utility on target. Defaults to "md5sum".
+        timeout: Timeout for each batch. Defaults to 200.
+        max_cmd_len: Maximum length of the path list per command. Defaults to 3000.
+
+    Returns:
+        dict: Hex digest by target path.
+    """
+    hashes = {}
+    batches = [[]]
+    length = 0
+    for path in paths:
+        if batches[-1] and length + len(path) + 1 > max_cmd_len:
+            batches.append([])
+            length = 0
+        batches[-1].append(path)
+        length += len(path) + 1
+
+    for batch in filter(None, batches):
+        console.runcmd(
+            f"{hash_cmd} {' '.join(batch)} 2>/dev/null; true", timeout=timeout
+        )
+        for digest, path in re.findall(
+            r"^([0-9a-f]{32,128})\s+\*?(\S+)\s*$", console.output(), re.M
+        ):
+            hashes[path] = digest
+    return hashes
+
+
+def scp_delta_transfer(
+    self,
+    target_console,
+    images: Optional[str] = None,
+    target_path: Optional[str] = None,
+    target_ip: str = "",
+    proxy_server: Optional[str] = None,
+    user: str = "root",
+    password: str = "root",
+    timeout: int = 3000,
+    cache_file: Optional[str] = None,
+) -> List[str]:
+    """Transfers only image files whose content differs on target.
+
+    Host hashes come from a HashCache keyed by path, size and mtime, target
+    hashes are computed with batched md5sum commands on target_console.
+    Changed files are sent with scp_file_transfer, one scp per destination
+    directory.
+
+    Args:
+        target_console: Xexpect console on target used to hash deployed files.
+        images: Glob of image files to be transfered. Defaults to "{images}/*" from config.
+        target_path: Path on target. Defaults to target_path from config.
+        target_ip: IP address of target. Defaults to "".
+        proxy_server: Address of proxy server. Defaults to None.
+        user: Username used for login. Defaults to "root".
+        password: Password user for login. Defaults to "root".
+        timeout: Time for expected output. Defaults to 3000.
+        cache_file: Host hash cache file. Defaults to HashCache default.
+
+    Returns:
+        list: Host paths of the transferred files.
+    """
+    if not images:
+        images = f"{self.config['images']}/*"
+    if not target_path:
+        target_path = f"{self.config['target_path']}"
+
+    files = {}
+    for path in sorted(glob.glob(images)):
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    host_file = os.path.join(root, name)
+                    rel_path = os.path.relpath(host_file, os.path.dirname(path))
+                    files[host_file] = posixpath.join(target_path, rel_path)
+        else:
+            files[path] = posixpath.join(target_path, os.path.basename(path))
+
+    cache = HashCache(cache_file)
+    remote = target_hashes(target_console, list(files.values()))
+    changed = [f for f, dest in files.items() if remote.get(dest) != cache.hash(f)]
+    cache.save()
+
+    groups = {}
+    for host_file in changed:
+        groups.setdefault(posixpath.dirname(files[host_file]), []).append(host_file)
+    sub_dirs = [d for d in groups if d != target_path]
+    if sub_dirs:
+        target_console.runcmd(f"mkdir -p {' '.join(sub_dirs)}")
+    for dest_dir, group in groups.items():
+        scp_file_transfer(
+            self,
+            images=" ".join(group),
+            target_path=dest_dir,
+            target_ip=target_ip,
+            proxy_server=proxy_server,
+            user=user,
+            password=password,
+            timeout=timeout,
+        )
+
+    skipped = sum(os.path.getsize(f) for f in files if f not in changed)
+    log.info(
+        f"Delta deploy to {target_path}: {len(changed)} of {len(files)} files "
+        f"transferred, {skipped} bytes skipped"
+    )
+    return changed
 
 
 def pxssh_login(self, userid: str, password: str) -> None:
@@ -129,14 +675,25 @@ def pxssh_login(self, userid: str, password: str) -> None:
         raise ConnectionError(err)
 
 
-def ssh_login_user(self, userid: str, password: str) -> None:
-    sshcmd = f"ssh -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null {userid}@{self.ip} -y"
+def ssh_login_user(
+    self,
+    userid: str,
+    password: str,
+    timeout: int = 60,
+    retries: int = 4,
+    connect_timeout: Optional[int] = None,
+) -> None:
+    sshcmd = "ssh -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null "
+    if connect_timeout is not None:
+        sshcmd += f"-o ConnectTimeout={connect_timeout} "
+    sshcmd += f"{userid}@{self.ip} -y"
     terminal = pexpect.spawn(
         sshcmd, echo=self.echo, encoding="utf-8", codec_errors="replace"
     )
     terminal.logfile = FileAdapter(log)
     self.terminal = terminal
-    for n in range(4):
+    failures = 0
+    while failures < retries:
         try:
             index = self.terminal.expect(
                 [
@@ -146,7 +703,7 @@ def ssh_login_user(self, userid: str, password: str) -> None:
                     "Permission denied",
                     "(%|#|>|\\$|# )",
                 ],
-                timeout=60,
+                timeout=timeout,
             )
             if index == 4:
                 break
@@ -162,20 +719,23 @@ def ssh_login_user(self, userid: str, password: str) -> None:
                 )
         except ConnectionError as e:
             log.error(e)
-        time.sleep(1)
-
-    if n >= 3:
+            failures += 1
+            if failures < retries:
+                time.sleep(1)
+    else:
         err = f"Failed to establish ssh connection with {self.ip}, username:{userid} password:{password}"
         log.error(err)
         raise ConnectionError(err)
     self.terminal.sendline("/bin/bash --norc")
-    self.terminal.expect("bash-", timeout=60)
+    self.terminal.expect("bash-", timeout=timeout)
 
 
-def ssh_login(self) -> None:
+def ssh_login(self, timeout: int = 120, connect_timeout: Optional[int] = None) -> None:
 
     if self.hostname == socket.gethostname():
         sshcmd = "/bin/bash --norc"
+    elif connect_timeout is not None:
+        sshcmd = f"{self.cmd} -o ConnectTimeout={connect_timeout} {self.ip} '/bin/bash --norc'"
     else:
         sshcmd = f"{self.cmd} {self.ip} '/bin/bash --norc'"
 
@@ -185,7 +745,7 @@ def ssh_login(self) -> None:
     terminal.logfile = FileAdapter(log)
 
     index = terminal.expect(
-        [pexpect.EOF, pexpect.TIMEOUT, "bash-", "password:"], timeout=120
+        [pexpect.EOF, pexpect.TIMEOUT, "bash-", "password:"], timeout=timeout
     )
     if index == 2:
         self.terminal = terminal
@@ -0,0 +1,180 @@
+#
+# Copyright (c) 2020 Xilinx, Inc. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+
+"""
+Background sampling of target CPU, memory and thermal telemetry.
+"""
+
+import re
+import json
+import time
+import logging
+import threading
+from array import array
+from typing import Callable, Optional
+
+log = logging.getLogger(__name__)
+
+# One round trip collects all sources
+TELEMETRY_CMD = (
+    "head -n1 /proc/stat; "
+    "grep -E '^(MemTotal|MemAvailable|SwapTotal|SwapFree):' /proc/meminfo; "
+    "for z in /sys/class/thermal/thermal_zone*/temp; "
+    'do [ -r "$z" ] && echo "temp: $(cat $z)"; done'
+)
+
+TELEMETRY_FIELDS = ("time", "cpu", "iowait", "mem_used", "swap_used", "temp")
+
+
+def parse_telemetry(output: str) -> dict:
+    """Parses the output of TELEMETRY_CMD.
+
+    Returns:
+        dict: CPU jiffies ("cpu" as total, idle and iowait), memory values
+        in kB and the highest thermal zone temperature in degrees Celsius.
+    """
+    sample = {"cpu": None, "temp": None}
+    temps = []
+    for line in output.splitlines():
+        fields = line.split()
+        if not fields:
+            continue
+        if fields[0] == "cpu":
+            jiffies = [int(v) for v in fields[1:] if v.isdigit()]
+            sample["cpu"] = (sum(jiffies[:8]), jiffies[3], jiffies[4])
+        elif fields[0] == "temp:" and len(fields) > 1 and fields[1].isdigit():
+            temps.append(int(fields[1]) / 1000.0)
+        else:
+            match = re.match(r"(\w+):\s+(\d+)", line)
+            if match:
+                sample[match.group(1)] = int(match.group(2))
+    if temps:
+        sample["temp"] = max(temps)
+    return sample
+
+
+class TelemetrySampler:
+    """Samples target load, memory pressure and temperature in the background.
+
+    Every interval a single batched command reads /proc/stat, /proc/meminfo
+    and the thermal zones over the console. Samples are stored as
+    array-backed series of CPU and iowait utilization in percent, used
+    memory in percent, used swap in kB and the highest temperature in
+    degrees Celsius (NaN if unavailable). The console should be dedicated
+    to the sampler, as its commands would otherwise interleave with the
+    test's.
+
+    Args:
+        console: Xexpect console to the target.
+        interval (float): Seconds between samples. Defaults to 5.
+        timeout (float): Timeout of the sampling command. Defaults to 10.
+    """
+
+    def __init__(self, console, interval: float = 5, timeout: float = 10) -> None:
+        self.console = console
+        self.interval = interval
+        self.timeout = timeout
+        self.series = {field: array("d") for field in TELEMETRY_FIELDS}
+        self.errors = 0
+        self._prev_cpu = None
+        self._start = None
+        self._stop = None
+        self._thread = None
+
+    def sample(self) -> None:
+        """Takes one sample."""
+        self.console.runcmd(TELEMETRY_CMD, timeout=self.timeout)
+        self.add_sample(parse_telemetry(self.console.output()))
+
+    def add_sample(self, sample: dict, timestamp: Optional[float] = None) -> None:
+        """Appends a parsed sample to the series."""
+        now = time.time() if timestamp is None else timestamp
+        if self._start is None:
+            self._start = now
+        nan = float("nan")
+        cpu = iowait = nan
+        if sample["cpu"] is not None:
+            if self._prev_cpu is not None:
+                total, idle, io = (
+                    cur - prev for cur, prev in zip(sample["cpu"], self._prev_cpu)
+                )
+                if total > 0:
+                    cpu = 100.0 * (total - idle - io) / total
+                    iowait = 100.0 * io / total
+            self._prev_cpu = sample["cpu"]
+        mem_used = nan
+        if sample.get("MemTotal") and "MemAvailable" in sample:
+            mem_used = 100.0 * (1 - sample["MemAvailable"] / sample["MemTotal"])
+        swap_used = nan
+        if "SwapTotal" in sample and "SwapFree" in sample:
+            swap_used = float(sample["SwapTotal"] - sample["SwapFree"])
+        temp = nan if sample["temp"] is None else sample["temp"]
+        for field, value in zip(
+            TELEMETRY_FIELDS,
+            (now - self._start, cpu, iowait, mem_used, swap_used, temp),
+        ):
+            self.series[field].append(value)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                self.errors += 1
+                log.warning(f"Telemetry sample failed: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self) -> "TelemetrySampler":
+        """Starts sampling in a background thread."""
+        self.stop()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops the background thread."""
+        if self._stop is not None:
+            self._stop.set()
+            self._thread.join()
+            self._stop = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def summary(self) -> dict:
+        """Returns sample count and mean and max of each series."""
+        result = {"samples": len(self.series["time"]), "errors": self.errors}
+        for field in TELEMETRY_FIELDS[1:]:
+            values = [v for v in self.series[field] if v == v]
+            result[field] = {
+                "mean": round(sum(values) / len(values), 2) if values else None,
+                "max": round(max(values), 2) if values else None,
+            }
+        return result
+
+    def to_dict(self) -> dict:
+        """Returns the series as lists, NaN mapped to None."""
+        return {
+            field: [v if v == v else None for v in values]
+            for field, values in self.series.items()
+        }
+
+    def save(self, file_path: str) -> None:
+        """Writes summary and series to a JSON file."""
+        with open(file_path, "w") as fd:
+            json.dump({"summary": self.summary(), "series": self.to_dict()}, fd)
+
+    def attach(self, record_property: Callable[[str, str], None]) -> None:
+        """Attaches the summary to a test result.
+
+        Args:
+            record_property: pytest's record_property fixture or any callable
+                taking a name and a value.
+        """
+        record_property("telemetry", json.dumps(self.summary(), sort_keys=True))
@@ -0,0 +1,159 @@
+#
+# Copyright (c) 2020 Xilinx, Inc. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+
+"""
+Adaptive command timeouts derived from observed command durations.
+"""
+
+import os
+import re
+import math
+import atexit
+import logging
+from typing import Callable, Optional
+from filelock import FileLock
+from roast.utils import read_json, write_json
+
+log = logging.getLogger(__name__)
+
+
+def command_signature(cmd: str, tokens: Optional[int] = None) -> str:
+    """Reduces a command to a signature shared by similar invocations.
+
+    Numbers are masked and whitespace is normalized, so that "sleep 5" and
+    "sleep 10" or "dd ... count=1" variants map to one entry.
+
+    Args:
+        cmd (str): Command line.
+        tokens (int): Number of leading tokens to keep. Defaults to None, keeping all.
+
+    Returns:
+        str: Command signature.
+    """
+    cmd = re.sub(r"0x[0-9a-fA-F]+|\d+", "#", cmd.strip())
+    return " ".join(cmd.split()[:tokens])
+
+
+def percentile(samples, pct: float) -> float:
+    """Nearest rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    rank = max(math.ceil(pct / 100.0 * len(ordered)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+class TimeoutModel:
+    """Learns per target and command signature timeouts from history.
+
+    Durations of successful commands are kept in a small JSON store. Once a
+    signature has min_samples observations its timeout is the chosen
+    percentile scaled by margin and clamped to [min_timeout, max_timeout];
+    until then the caller's default applies. A command timing out is
+    recorded at its timeout, a lower bound of its duration, and the
+    timeout of its signature is doubled for the rest of the session, so a
+    target slowing down is not failed by its own history.
+
+    Args:
+        store_path (str): JSON file holding the duration history.
+        pct (float): Percentile of observed durations. Defaults to 95.
+        margin (float): Factor applied to the percentile. Defaults to 3.0.
+        min_timeout (float): Lower bound of derived timeouts. Defaults to 5.
+        max_timeout (float): Upper bound of derived timeouts. Defaults to None.
+        min_samples (int): Observations needed before adapting. Defaults to 5.
+        max_samples (int): Observations kept per signature. Defaults to 50.
+        signature (callable): Maps a command to its signature. Defaults to
+            command_signature.
+    """
+
+    def __init__(
+        self,
+        store_path: str,
+        pct: float = 95,
+        margin: float = 3.0,
+        min_timeout: float = 5,
+        max_timeout: Optional[float] = None,
+        min_samples: int = 5,
+        max_samples: int = 50,
+        signature: Callable[[str], str] = command_signature,
+    ) -> None:
+        self.store_path = store_path
+        self.pct = pct
+        self.margin = margin
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.signature = signature
+        self.lock = FileLock(f"{store_path}.lock")
+        self._new = {}
+        self._backoff = {}
+        self.history = self._load()
+        atexit.register(self.save)
+
+    def _load(self) -> dict:
+        if os.path.isfile(self.store_path):
+            try:
+                return read_json(self.store_path)
+            except (ValueError, TypeError):
+                log.warning(f"Ignoring invalid timeout store {self.store_path}")
+        return {}
+
+    def _key(self, target: str, cmd: str) -> str:
+        return f"{target}|{self.signature(cmd)}"
+
+    def timeout(self, target: str, cmd: str, default: float) -> float:
+        """Returns the timeout to be used for a command.
+
+        Args:
+            target (str): Target identifier such as hostname or ip.
+            cmd (str): Command line.
+            default (float): Timeout used while history is insufficient.
+
+        Returns:
+            float: Timeout in seconds.
+        """
+        key = self._key(target, cmd)
+        samples = self.history.get(key, [])
+        if len(samples) < self.min_samples:
+            return default
+        timeout = max(
+            percentile(samples, self.pct) * self.margin,
+            self._backoff.get(key, 0),
+            self.min_timeout,
+        )
+        if self.max_timeout is not None:
+            timeout = min(timeout, self.max_timeout)
+        return timeout
+
+    def record(self, target: str, cmd: str, duration: float) -> None:
+        """Records the duration of a successful command."""
+        self._add(self._key(target, cmd), duration)
+
+    def record_timeout(self, target: str, cmd: str, timeout: float) -> None:
+        """Records a command which timed out after timeout seconds."""
+        key = self._key(target, cmd)
+        self._add(key, timeout)
+        self._backoff[key] = timeout * 2
+        log.warning(f"{cmd} timed out after {timeout}s, backing off to {timeout * 2}s")
+
+    def _add(self, key: str, duration: float) -> None:
+        duration = round(duration, 3)
+        samples = self.history.setdefault(key, [])
+        samples.append(duration)
+        del samples[: -self.max_samples]
+        self._new.setdefault(key, []).append(duration)
+
+    def save(self) -> None:
+        """Merges new observations into the store shared by other processes."""
+        if not self._new:
+            return
+        with self.lock:
+            history = self._load()
+            for key, durations in self._new.items():
+                samples = history.setdefault(key, [])
+                samples.extend(durations)
+                del samples[: -self.max_samples]
+            write_json(self.store_path, history)
+        self.history = history
+        self._new = {}
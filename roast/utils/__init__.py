@@ -12,3 +12,4 @@ from .test_utils import *
 from .plugin import *
 from .logger import *
 from .file import *
+from .metrics import *
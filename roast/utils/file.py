@@ -8,7 +8,9 @@ import json
 import os
 import time
 import shutil
-from roast.utils import is_dir, remove, copyDirectory
+import hashlib
+from filelock import FileLock
+from roast.utils import is_dir, remove, copyDirectory, mkdir
 
 log = logging.getLogger(__name__)
 
@@ -151,3 +153,72 @@ def discard_old_data(path, exclude_files=[], exclude_dirs=[], num_of_days=2):
                     remove(os.path.join(r, file))
             except Exception as err:
                 log.error(err)
+
+
+class HashCache:
+    """Host side cache of file content hashes keyed by path, size and mtime.
+
+    Parameters:
+        cache_file : JSON file persisting the cache across runs, defaults
+                     to ~/.cache/roast/hash_cache.json
+        algorithm : hashlib algorithm name, defaults to md5 as md5sum is
+                    available on most targets
+    """
+
+    def __init__(self, cache_file=None, algorithm="md5"):
+        if cache_file is None:
+            cache_file = os.path.join(
+                os.path.expanduser("~"), ".cache", "roast", "hash_cache.json"
+            )
+        self.cache_file = cache_file
+        self.algorithm = algorithm
+        self.lock = FileLock(f"{cache_file}.lock")
+        self._entries = self._load()
+        self._dirty = False
+
+    def _load(self):
+        if os.path.isfile(self.cache_file):
+            try:
+                return read_json(self.cache_file)
+            except (ValueError, TypeError):
+                pass
+        return {}
+
+    def hash(self, file_path):
+        """Returns the hex digest of a file, computing it only when the
+        file size or mtime changed since the last call.
+        """
+        file_path = os.path.abspath(file_path)
+        st = os.stat(file_path)
+        entry = self._entries.get(file_path)
+        if (
+            entry
+            and entry["size"] == st.st_size
+            and entry["mtime"] == st.st_mtime
+            and entry["algorithm"] == self.algorithm
+        ):
+            return entry["hash"]
+        h = hashlib.new(self.algorithm)
+        with open(file_path, "rb") as fd:
+            for block in iter(lambda: fd.read(1 << 20), b""):
+                h.update(block)
+        self._entries[file_path] = {
+            "size": st.st_size,
+            "mtime": st.st_mtime,
+            "algorithm": self.algorithm,
+            "hash": h.hexdigest(),
+        }
+        self._dirty = True
+        return h.hexdigest()
+
+    def save(self):
+        """Merges and writes the cache to cache_file."""
+        if not self._dirty:
+            return
+        mkdir(os.path.dirname(os.path.abspath(self.cache_file)))
+        with self.lock:
+            entries = self._load()
+            entries.update(self._entries)
+            write_json(self.cache_file, entries)
+        self._entries = entries
+        self._dirty = False
@@ -0,0 +1,186 @@
+#
+# Copyright (c) 2020 Xilinx, Inc. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from abc import ABCMeta, abstractmethod
+
+log = logging.getLogger(__name__)
+
+_metrics_lock = threading.Lock()
+_metrics_sinks = []
+_metrics_events = []
+
+
+class MetricsSink(metaclass=ABCMeta):
+    """Base class of metrics sinks receiving structured transfer events."""
+
+    @abstractmethod
+    def emit(self, event: dict) -> None:
+        """Handles an event.
+
+        Args:
+            event (dict): Event with at least a "kind" key.
+        """
+
+
+class LogSink(MetricsSink):
+    """Writes events to a logger at debug level."""
+
+    def __init__(self, logger=log):
+        self.logger = logger
+
+    def emit(self, event):
+        self.logger.debug(f"metrics: {json.dumps(event, sort_keys=True)}")
+
+
+class JsonLinesSink(MetricsSink):
+    """Appends events as JSON lines to a file."""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+
+    def emit(self, event):
+        with open(self.file_path, "a") as fd:
+            fd.write(json.dumps(event, sort_keys=True) + "\n")
+
+
+def add_metrics_sink(sink: MetricsSink) -> None:
+    """Registers a sink receiving every emitted event."""
+    with _metrics_lock:
+        _metrics_sinks.append(sink)
+
+
+def remove_metrics_sink(sink: MetricsSink) -> None:
+    """Unregisters a sink added with add_metrics_sink."""
+    with _metrics_lock:
+        if sink in _metrics_sinks:
+            _metrics_sinks.remove(sink)
+
+
+def emit_event(event: dict) -> None:
+    """Records an event for the session summary and dispatches it to sinks.
+
+    Args:
+        event (dict): Event with at least a "kind" key.
+    """
+    event.setdefault("time", time.time())
+    with _metrics_lock:
+        _metrics_events.append(event)
+        sinks = list(_metrics_sinks)
+    for sink in sinks:
+        try:
+            sink.emit(event)
+        except Exception as err:
+            log.warning(f"Metrics sink {sink} failed: {err}")
+
+
+@contextmanager
+def transfer_metrics(kind: str, **fields):
+    """Times a transfer and emits it as an event on completion.
+
+    The yielded event dictionary can be updated by the caller, e.g. with
+    bytes moved or retries taken. Duration and status ("ok" or "failed")
+    are filled in when the block exits.
+
+    Args:
+        kind (str): Transfer path such as "scp", "rsync" or "put".
+        fields: Initial event fields such as target, files or bytes.
+    """
+    event = {"kind": kind, "target": "", "files": 0, "bytes": 0, "retries": 0}
+    event.update(fields)
+    start = time.monotonic()
+    try:
+        yield event
+        event["status"] = "ok"
+    except BaseException:
+        event["status"] = "failed"
+        raise
+    finally:
+        event["duration"] = time.monotonic() - start
+        emit_event(event)
+
+
+def get_metrics_events() -> list:
+    """Returns the events recorded in this session."""
+    with _metrics_lock:
+        return list(_metrics_events)
+
+
+def reset_metrics() -> None:
+    """Clears the events recorded in this session."""
+    with _metrics_lock:
+        del _metrics_events[:]
+
+
+def metrics_summary() -> dict:
+    """Aggregates session events by kind and target.
+
+    Returns:
+        dict: Count, failures, files, bytes, retries, duration and
+        throughput in bytes per second keyed by (kind, target).
+    """
+    summary = {}
+    for event in get_metrics_events():
+        key = (event["kind"], str(event.get("target", "")))
+        entry = summary.setdefault(
+            key,
+            {
+                "count": 0,
+                "failures": 0,
+                "files": 0,
+                "bytes": 0,
+                "retries": 0,
+                "duration": 0.0,
+            },
+        )
+        entry["count"] += 1
+        entry["failures"] += event.get("status") == "failed"
+        for field in ("files", "bytes", "retries", "duration"):
+            entry[field] += event.get(field) or 0
+    for entry in summary.values():
+        duration = entry["duration"]
+        entry["throughput"] = entry["bytes"] / duration if duration else 0.0
+    return summary
+
+
+def metrics_table() -> str:
+    """Formats the session summary as a text table, slowest links first."""
+    header = (
+        "kind",
+        "target",
+        "count",
+        "fail",
+        "files",
+        "MiB",
+        "retry",
+        "sec",
+        "MiB/s",
+    )
+    rows = [
+        (
+            kind,
+            target,
+            str(e["count"]),
+            str(e["failures"]),
+            str(e["files"]),
+            f"{e['bytes'] / 2**20:.2f}",
+            str(e["retries"]),
+            f"{e['duration']:.2f}",
+            f"{e['throughput'] / 2**20:.2f}",
+        )
+        for (kind, target), e in sorted(
+            metrics_summary().items(), key=lambda item: item[1]["throughput"]
+        )
+    ]
+    widths = [max(len(row[i]) for row in [header] + rows) for i in range(len(header))]
+    lines = [
+        "  ".join(cell.ljust(width) for cell, width in zip(row, widths))
+        for row in [header] + rows
+    ]
+    return "\n".join(lines)
@@ -11,11 +11,18 @@ except ImportError:
     import importlib_metadata
 
 import logging
+import threading
+from typing import Optional
 from roast.exceptions import PluginError
-from stevedore import ExtensionManager
+from stevedore import ExtensionManager, driver, named
+from stevedore.extension import Extension
 
 log = logging.getLogger(__name__)
 
+# Process wide (namespace, name) -> (entry point, plugin class) resolutions
+_plugin_cache = {}
+_plugin_cache_lock = threading.Lock()
+
 
 def register_plugin(name, plugin_type, entry_point) -> None:
     """Registers a plugin dynamically without needing to install as a package.
@@ -54,9 +61,97 @@ def register_plugin(name, plugin_type, entry_point) -> None:
                 e.ENTRY_POINT_CACHE[namespace] = entry_points
         else:
             e.ENTRY_POINT_CACHE[namespace] = [ep]
+        with _plugin_cache_lock:
+            _plugin_cache.pop((namespace, name), None)
         ep.load()
     except:
         raise PluginError(
             f"Unable to load plugin {name}, {plugin_type}, {entry_point}",
             log_stack=True,
         )
+
+
+def _resolve_plugin(namespace: str, name: str):
+    key = (namespace, name)
+    with _plugin_cache_lock:
+        if key in _plugin_cache:
+            return _plugin_cache[key]
+    ext = driver.DriverManager(
+        namespace=namespace, name=name, invoke_on_load=False
+    ).extensions[0]
+    with _plugin_cache_lock:
+        _plugin_cache[key] = (ext.entry_point, ext.plugin)
+    return ext.entry_point, ext.plugin
+
+
+def clear_plugin_cache() -> None:
+    """Forgets all cached plugin resolutions."""
+    with _plugin_cache_lock:
+        _plugin_cache.clear()
+
+
+def load_driver(
+    namespace: str,
+    name: str,
+    invoke_args: tuple = (),
+    invoke_kwds: Optional[dict] = None,
+) -> driver.DriverManager:
+    """Loads and instantiates a driver plugin, caching its resolution.
+
+    Entry points of a (namespace, name) pair are only scanned the first
+    time it is loaded in the process.
+
+    Args:
+        namespace (str): Plugin namespace such as "roast.board".
+        name (str): Plugin name.
+        invoke_args (tuple): Positional arguments of the plugin constructor.
+        invoke_kwds (dict): Keyword arguments of the plugin constructor.
+
+    Returns:
+        DriverManager holding the plugin instance.
+
+    Raises:
+        NoMatches (Exception): Raised when no plugin of that name exists.
+    """
+    entry_point, plugin = _resolve_plugin(namespace, name)
+    obj = plugin(*invoke_args, **(invoke_kwds or {}))
+    return driver.DriverManager.make_test_instance(
+        Extension(name, entry_point, plugin, obj), namespace=namespace
+    )
+
+
+def load_extensions(
+    namespace: str,
+    names: list,
+    invoke_args: tuple = (),
+    invoke_kwds: Optional[dict] = None,
+) -> named.NamedExtensionManager:
+    """Loads and instantiates named plugins, caching their resolution.
+
+    As with stevedore's NamedExtensionManager, names without a plugin and
+    plugins failing to load are skipped.
+
+    Args:
+        namespace (str): Plugin namespace such as "roast.component.system".
+        names (list): Plugin names.
+        invoke_args (tuple): Positional arguments of the plugin constructors.
+        invoke_kwds (dict): Keyword arguments of the plugin constructors.
+
+    Returns:
+        NamedExtensionManager holding the plugin instances in the order of names.
+    """
+    extensions = []
+    for name in names:
+        try:
+            entry_point, plugin = _resolve_plugin(namespace, name)
+        except driver.NoMatches:
+            continue
+        try:
+            obj = plugin(*invoke_args, **(invoke_kwds or {}))
+        except Exception as err:
+            log.error(f"Could not load {name}: {err}", exc_info=True)
+            continue
+        extensions.append(Extension(name, entry_point, plugin, obj))
+    return named.NamedExtensionManager.make_test_instance(
+        extensions, namespace=namespace
+    )
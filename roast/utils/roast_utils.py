@@ -5,10 +5,12 @@
 
 import os
 import sys
+import time
 import git
 import glob
 import logging
 import fileinput
+import fnmatch
 import shutil
 import inspect
 import argparse
@@ -24,6 +26,7 @@ from pathlib import Path
 from distutils.dir_util import copy_tree
 from git.exc import GitCommandError, InvalidGitRepositoryError
 from roast.exceptions import DirectoryNotFoundError, GitError
+from roast.utils.metrics import transfer_metrics
 
 from typing import Any, List, Optional, Dict
 from warnings import warn
@@ -1427,7 +1430,238 @@ def rsync(console, src, dest, exclude_list=[".git*"], timeout=200):
     elif len(exclude_list) == 1:
         exclude = "".join(exclude_list)
         cmd += f"  --exclude={exclude}"
-    console.runcmd(cmd, timeout=timeout)
+    with transfer_metrics("rsync", target=dest):
+        console.runcmd(cmd, timeout=timeout)
+
+
+def _rsync_stat(output: str, name: str) -> int:
+    match = re.search(rf"{name}: ([\d,.]+)", output)
+    return int(re.sub(r"[,.]", "", match.group(1))) if match else 0
+
+
+def _rsync_progress(output: str) -> int:
+    # Last --info=progress2 update: bytes of file data transferred so far
+    progress = re.findall(r"([\d,]+)\s+\d+%", output)
+    return int(progress[-1].replace(",", "")) if progress else 0
+
+
+def _rsync_dry_run(
+    console, src, dest, excludes, retries=3, retry_delay=10, timeout=3000
+) -> str:
+    # Returns the --stats of a dry run, $? keeps the echoed command from
+    # matching the return code pattern
+    cmd = f'rsync -an --stats {src} {dest}{excludes}; echo "rsync_rc=$?"'
+    for attempt in range(1, retries + 1):
+        console.runcmd(
+            cmd, expected=r"rsync_rc=(\d+)", wait_for_prompt=False, timeout=timeout
+        )
+        output = console.terminal.before
+        returncode = int(console.terminal.match.group(1))
+        console.expect(timeout=timeout)
+        if returncode == 0:
+            return output
+        log.info(
+            f"rsync dry run returned {returncode}, retrying ({attempt} of {retries})"
+        )
+        time.sleep(retry_delay)
+    raise ConnectionError(
+        f"Failed to rsync {src} to {dest}: dry run failed {retries} times"
+    )
+
+
+def rsync_resume(
+    console, src, dest, exclude_list=[".git*"], retries=5, retry_delay=10, timeout=3000
+) -> dict:
+    """Transfers files with rsync, resuming interrupted transfers.
+
+    Partially transferred files are kept with --partial. Retries continue
+    them from their last offset with --append-verify, which checks the
+    whole file checksum and retransmits on mismatch, so each retry only
+    sends what is still missing. The first attempt does not append, since
+    --append skips files whose destination is as long as the source.
+
+    A dry run first measures the file data missing on dest. File data sent
+    is taken from the literal data of the successful attempt and the last
+    progress report of interrupted ones, whatever exceeds the missing data
+    was sent more than once.
+
+    Args:
+        console: Xexpect console running rsync.
+        src (str): rsync source.
+        dest (str): rsync destination.
+        exclude_list (list): Patterns to exclude. Defaults to [".git*"].
+        retries (int): Number of attempts. Defaults to 5.
+        retry_delay (int): Seconds between attempts. Defaults to 10.
+        timeout (int): Timeout for each attempt. Defaults to 3000.
+
+    Returns:
+        dict: Attempts, file data missing on dest ("size"), file data sent
+        over all attempts ("bytes_sent") and file data sent more than once
+        ("bytes_resent").
+
+    Raises:
+        ConnectionError: When the dry run or all attempts fail.
+    """
+    excludes = ""
+    if exclude_list:
+        excludes = "".join(f" --exclude='{e}'" for e in exclude_list)
+
+    stats = {"attempts": 0, "size": 0, "bytes_sent": 0, "bytes_resent": 0}
+    with transfer_metrics("rsync", target=dest) as event:
+        output = _rsync_dry_run(
+            console, src, dest, excludes, retries, retry_delay, timeout
+        )
+        stats["size"] = _rsync_stat(output, "Total transferred file size")
+        for attempt in range(1, retries + 1):
+            stats["attempts"] = attempt
+            event["retries"] = attempt - 1
+            append = " --append-verify" if attempt > 1 else ""
+            # $? keeps the echoed command from matching the return code pattern
+            cmd = (
+                f"rsync -a --partial{append} --stats --info=progress2 {src} {dest}"
+                f'{excludes}; echo "rsync_rc=$?"'
+            )
+            console.runcmd(
+                cmd, expected=r"rsync_rc=(\d+)", wait_for_prompt=False, timeout=timeout
+            )
+            output = console.terminal.before
+            returncode = int(console.terminal.match.group(1))
+            console.expect(timeout=timeout)
+            if returncode == 0:
+                stats["bytes_sent"] += _rsync_stat(output, "Literal data")
+            else:
+                # Interrupted attempts print no --stats
+                stats["bytes_sent"] += _rsync_progress(output)
+            stats["bytes_resent"] = max(0, stats["bytes_sent"] - stats["size"])
+            event["bytes"] = stats["bytes_sent"]
+            if returncode == 0:
+                log.info(
+                    f"rsync {src} to {dest} completed after {attempt} attempt(s), "
+                    f"{stats['bytes_sent']} bytes sent, {stats['bytes_resent']} re-sent"
+                )
+                return stats
+            log.info(f"rsync returned {returncode}, resuming ({attempt} of {retries})")
+            time.sleep(retry_delay)
+        raise ConnectionError(
+            f"Failed to rsync {src} to {dest} after {retries} attempts"
+        )
+
+
+def partition_shards(sizes: Dict[str, int], shards: int) -> List[List[str]]:
+    """Partitions entries into balanced shards, largest first into the lightest shard.
+
+    Args:
+        sizes (dict): Size by entry name.
+        shards (int): Number of shards.
+
+    Returns:
+        list: Non empty lists of entry names.
+    """
+    buckets = [[0, []] for _ in range(max(shards, 1))]
+    for name in sorted(sizes, key=lambda n: (-sizes[n], n)):
+        bucket = min(buckets, key=lambda b: b[0])
+        bucket[0] += sizes[name]
+        bucket[1].append(name)
+    return [names for _, names in buckets if names]
+
+
+def _tree_size(path: str) -> int:
+    if not os.path.isdir(path) or os.path.islink(path):
+        return os.lstat(path).st_size
+    return sum(
+        os.lstat(os.path.join(root, f)).st_size
+        for root, _, files in os.walk(path)
+        for f in files
+    )
+
+
+def rsync_sharded(
+    console, src, dest, shards=4, exclude_list=[".git*"], by="size", timeout=3000
+) -> dict:
+    """Syncs the contents of a directory with concurrent rsync processes.
+
+    Top level entries of src are partitioned into shards balanced by size
+    (by="size") or by entry count (by="count"), excluded entries are left
+    out. A dry run reports the files and amount of data to transfer before
+    the shards run as background jobs of one console command.
+
+    Args:
+        console: Xexpect console on the host holding src.
+        src (str): Source directory, its contents are synced into dest.
+        dest (str): rsync destination directory.
+        shards (int): Number of concurrent rsync processes. Defaults to 4.
+        exclude_list (list): Patterns to exclude. Defaults to [".git*"].
+        by (str): "size" or "count". Defaults to "size".
+        timeout (int): Timeout for the sync. Defaults to 3000.
+
+    Returns:
+        dict: Shards, estimated bytes, files to transfer, per shard return
+        codes and duration.
+
+    Raises:
+        ValueError: When by is not supported.
+        ConnectionError: When the dry run or a shard fails.
+    """
+    if by not in ("size", "count"):
+        raise ValueError(f"Unsupported shard partitioning {by}")
+    src = src.rstrip("/")
+    excludes = "".join(f" --exclude='{e}'" for e in exclude_list)
+
+    entries = [
+        e
+        for e in sorted(os.listdir(src))
+        if not any(fnmatch.fnmatch(e, pattern) for pattern in exclude_list)
+    ]
+    sizes = {
+        e: _tree_size(os.path.join(src, e)) if by == "size" else 1 for e in entries
+    }
+    groups = partition_shards(sizes, shards)
+    if not groups:
+        console.runcmd(f"mkdir -p {dest}", timeout=timeout)
+        log.info(f"rsync {src} to {dest}: nothing to sync")
+        return {
+            "shards": [],
+            "estimate": 0,
+            "files": 0,
+            "returncodes": [],
+            "duration": 0.0,
+        }
+
+    output = _rsync_dry_run(console, f"{src}/", f"{dest}/", excludes, timeout=timeout)
+    estimate = _rsync_stat(output, "Total transferred file size")
+    files = _rsync_stat(output, "Number of (?:regular )?files transferred")
+    log.info(
+        f"rsync {src} to {dest}: {files} files, {estimate} bytes in {len(groups)} shards"
+    )
+
+    jobs = []
+    for n, group in enumerate(groups):
+        paths = " ".join(os.path.join(src, e) for e in group)
+        jobs.append(f"rsync -aq {paths} {dest}/{excludes} & p{n}=$!")
+    waits = "; ".join(f"wait $p{n}; r{n}=$?" for n in range(len(groups)))
+    codes = ",".join(f"$r{n}" for n in range(len(groups)))
+    # $r<n> keeps the echoed command from matching the return code pattern
+    cmd = f"mkdir -p {dest}; {'; '.join(jobs)}; {waits}; echo \"shard_rc={codes}\""
+
+    start = time.monotonic()
+    with transfer_metrics("rsync", target=dest, files=files, bytes=estimate):
+        console.runcmd(
+            cmd, expected=r"shard_rc=([\d,]+)", wait_for_prompt=False, timeout=timeout
+        )
+        returncodes = [int(rc) for rc in console.terminal.match.group(1).split(",")]
+        console.expect(timeout=timeout)
+        failed = [groups[n] for n, rc in enumerate(returncodes) if rc != 0]
+        if failed:
+            raise ConnectionError(f"rsync shards {failed} to {dest} failed")
+    duration = time.monotonic() - start
+    log.info(f"rsync {src} to {dest} completed in {duration:.2f}s")
+    return {
+        "shards": groups,
+        "estimate": estimate,
+        "files": files,
+        "returncodes": returncodes,
+        "duration": duration,
+    }
 
 
 def str2bool(value: str) -> bool:
@@ -12,11 +12,31 @@ import inspect
 import asyncio
 import logging
 import atexit
+import random
+import threading
 import pexpect
-from typing import Optional, Union, List
+from typing import Optional, Union, List, Dict, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from roast.ssh import ssh_login_user, ssh_login
 from roast.utils import convert_list, colorstr_to_plainstr
 from roast.exceptions import ExpectError
+from roast.replay import SessionRecorder, ReplaySpawn
+from roast.console_transfer import console_put
+from roast.timeouts import TimeoutModel
+
+
+class _StreamTee:
+    """File-like object fanning out console data to registered readers."""
+
+    def __init__(self):
+        self.readers = []
+
+    def write(self, data):
+        for reader in list(self.readers):
+            reader.write(data)
+
+    def flush(self):
+        pass
 
 
 class Xexpect:
@@ -34,6 +54,9 @@ class Xexpect:
         non_interactive: bool = True,
         exit_nzero_ret: bool = False,
         echo: bool = False,
+        terminal=None,
+        login_timeout: Optional[int] = None,
+        login_retries: Optional[int] = None,
     ):
         self.log = log
         self.hostname = hostname  # TODO Fix same host running
@@ -43,10 +66,35 @@ class Xexpect:
         self.exit_nzero_ret = exit_nzero_ret  # if set, will assert on non zero returns
         self.echo = echo
         self.timeout_multiplier = 1  # To increase default timeout
+        self.timeout_model = None  # Opt-in adaptive timeouts
+        self._read_tee = _StreamTee()
+        self._send_tee = _StreamTee()
+        self._userid = userid
+        self._password = password
+        self.login_timeout = login_timeout  # Per attempt, ssh defaults if None
+        self.login_retries = login_retries
+        self._lock = threading.RLock()
+        self._last_activity = time.monotonic()
+        self._in_flight = False  # Sent and not yet expected
+        self._keepalive_stop = None
+        self.auto_reconnect = False  # Reconnect when the console is lost
+        self.reconnects = 0
+        self.downtime = 0.0
         atexit.register(self.exit)
         self._setup_ip_prompt(hostip, hostname)
-        self._setup_ssh(userid, password)
-        self._setup_init()
+        if terminal is None:
+            try:
+                self._setup_ssh(userid, password)
+                self._setup_init()
+            except BaseException:
+                # A console which failed to open has nothing to exit
+                atexit.unregister(self.exit)
+                if self.terminal is not None:
+                    self.terminal.close(force=True)
+                raise
+        else:
+            # Pre-established transport such as a session replay
+            self.terminal = terminal
 
     def _setup_ip_prompt(self, hostip, hostname):
         if hostip is None:
@@ -57,10 +105,15 @@ class Xexpect:
             self.prompt = "(%|#|>|\\$|# )"
 
     def _setup_ssh(self, userid, password):
+        kwargs = {}
+        if self.login_timeout is not None:
+            kwargs["timeout"] = kwargs["connect_timeout"] = self.login_timeout
         if None not in (userid, password):
-            ssh_login_user(self, userid, password)
+            if self.login_retries is not None:
+                kwargs["retries"] = self.login_retries
+            ssh_login_user(self, userid, password, **kwargs)
         else:
-            ssh_login(self)
+            ssh_login(self, **kwargs)
 
     def _setup_init(self):
         # Disable History
@@ -77,6 +130,7 @@ class Xexpect:
         self.sendline("check_nzero_exit")
         # Expect for prompt
         self.terminal.expect(self.prompt)
+        self._in_flight = False
         # Search fo return code
         matchObj = re.search(r"returncode=([\d]+)", self.terminal.before)
         if matchObj is not None:
@@ -118,30 +172,57 @@ class Xexpect:
             Index of the expected string.
         """
 
+        if self.timeout_model is not None:
+            timeout = self.timeout_model.timeout(self.ip, cmd, timeout)
+
         def _runcmd():
+            try:
+                return _runcmd_once()
+            except ExpectError:
+                if not self.auto_reconnect or self.terminal.isalive():
+                    raise
+                # Console lost while running the command
+                self.reconnect()
+                return _runcmd_once()
+
+        def _runcmd_once():
+            start = time.monotonic()
             self.sendline(cmd)
-            index = self.expect(
-                expected_failures,
-                expected,
-                wait_for_prompt=wait_for_prompt,
-                timeout=timeout,
-                err_index=len(convert_list(expected_failures)),
-                err_msg=err_msg,
-            )
+            try:
+                index = self.expect(
+                    expected_failures,
+                    expected,
+                    wait_for_prompt=wait_for_prompt,
+                    timeout=timeout,
+                    err_index=len(convert_list(expected_failures)),
+                    err_msg=err_msg,
+                )
+            except ExpectError:
+                # Failures and EOF end the expect early, timeouts do not,
+                # expect scales the timeout by timeout_multiplier
+                if (
+                    self.timeout_model is not None
+                    and time.monotonic() - start >= timeout * self.timeout_multiplier
+                ):
+                    self.timeout_model.record_timeout(self.ip, cmd, timeout)
+                raise
 
             if self.exit_nzero_ret and not expected:
                 index = self._exit_non_zero_return(cmd, custom_err=err_msg)
+            if self.timeout_model is not None:
+                self.timeout_model.record(self.ip, cmd, time.monotonic() - start)
             return index
 
-        for _ in range(retries - 1):
-            try:
+        with self._lock:
+            for _ in range(retries - 1):
+                try:
+                    ret = _runcmd()
+                    break  # break out of loop if success
+                except Exception:
+                    self.log.info("Retrying...")
+                    time.sleep(10)
+            else:
                 ret = _runcmd()
-                break  # break out of loop if success
-            except Exception:
-                self.log.info("Retrying...")
-                time.sleep(10)
-        else:
-            ret = _runcmd()
         return ret
 
     def runcmd_list(
@@ -204,6 +285,8 @@ class Xexpect:
         Args:
             cmd (str): cmd to be sent on to the console.
         """
+        self._last_activity = time.monotonic()
+        self._in_flight = True
         self.terminal.sendline(cmd)
 
     def sendline(self, cmd):
@@ -212,6 +295,8 @@ class Xexpect:
         Args:
             cmd (str): cmd to be sent on to the console.
         """
+        self._last_activity = time.monotonic()
+        self._in_flight = True
         self.terminal.sendline(cmd)
 
     def sendcontrol(self, cmd):
@@ -220,6 +305,8 @@ class Xexpect:
         Args:
             cmd (str): Control characters to be sent on console.
         """
+        self._last_activity = time.monotonic()
+        self._in_flight = True
         self.terminal.sendcontrol(cmd)
 
     def interact(self):
@@ -284,16 +371,21 @@ class Xexpect:
         if len(expected_list) == 0:
             raise ExpectError("Expected list is empty")
 
-        index = _expect(cons, expected_list, err_index, timeout)
-        # Expect again if expected strings are not self.prompt
-        if (
-            cons.terminal.isalive()
-            and wait_for_prompt
-            and self.prompt != None
-            and self.prompt != expected_list[index + err_index]
-        ):
-            # Making error index to 0, as prompt is expected
-            _expect(cons, self.prompt, 0, timeout)
+        with self._lock:
+            try:
+                index = _expect(cons, expected_list, err_index, timeout)
+                # Expect again if expected strings are not self.prompt
+                if (
+                    cons.terminal.isalive()
+                    and wait_for_prompt
+                    and self.prompt != None
+                    and self.prompt != expected_list[index + err_index]
+                ):
+                    # Making error index to 0, as prompt is expected
+                    _expect(cons, self.prompt, 0, timeout)
+            finally:
+                self._in_flight = False
+            self._last_activity = time.monotonic()
         return index
 
     def expect_async(self, expected=None, timeout=200):
@@ -307,12 +399,344 @@ class Xexpect:
         return
 
     def wait(self):
-        return asyncio.get_event_loop().run_until_complete(self.coro)
+        try:
+            return asyncio.get_event_loop().run_until_complete(self.coro)
+        finally:
+            self._in_flight = False
+
+    def _install_readers(self):
+        if self.terminal is not None:
+            self.terminal.logfile_read = (
+                self._read_tee if self._read_tee.readers else None
+            )
+            self.terminal.logfile_send = (
+                self._send_tee if self._send_tee.readers else None
+            )
+
+    def add_reader(self, reader, direction: str = "read") -> None:
+        """Registers a file-like object receiving console data as it streams past.
+
+        Args:
+            reader: Object with write() and flush() methods.
+            direction: "read" for received data, "send" for sent data. Defaults to "read".
+        """
+        tee = self._send_tee if direction == "send" else self._read_tee
+        tee.readers.append(reader)
+        self._install_readers()
+
+    def remove_reader(self, reader, direction: str = "read") -> None:
+        """Unregisters a reader added with add_reader."""
+        tee = self._send_tee if direction == "send" else self._read_tee
+        if reader in tee.readers:
+            tee.readers.remove(reader)
+        self._install_readers()
+
+    def record(self, path: str) -> SessionRecorder:
+        """Records sent lines and received data of this console to a session file.
+
+        Args:
+            path: Session file to be written.
+
+        Returns:
+            SessionRecorder, call stop_record() or its close() to finish recording.
+        """
+        self.recorder = SessionRecorder(
+            path, hostname=self.hostname, prompt=self.prompt
+        )
+        self.add_reader(self.recorder.read_tap)
+        self.add_reader(self.recorder.send_tap, direction="send")
+        return self.recorder
+
+    def stop_record(self) -> None:
+        """Stops the recording started with record()."""
+        recorder = getattr(self, "recorder", None)
+        if recorder is not None:
+            self.remove_reader(recorder.read_tap)
+            self.remove_reader(recorder.send_tap, direction="send")
+            recorder.close()
+            self.recorder = None
+
+    @classmethod
+    def replay(cls, log: logging.Logger, path: str, speed: float = 1.0, **kwargs):
+        """Creates a console playing back a session recorded with record().
+
+        Args:
+            log: Logger instance.
+            path: Session file to be replayed.
+            speed: Replay speed factor, 0 replays as fast as possible. Defaults to 1.0.
+
+        Returns:
+            Xexpect instance backed by the recorded session.
+        """
+        terminal = ReplaySpawn(path, speed=speed)
+        header = terminal.header
+        console = cls(
+            log,
+            hostname=header.get("hostname") or "replay",
+            hostip="replay",
+            terminal=terminal,
+            **kwargs,
+        )
+        if header.get("prompt") is not None:
+            console.prompt = header["prompt"]
+        return console
+
+    def enable_adaptive_timeout(self, store_path: str, **kwargs) -> TimeoutModel:
+        """Derives runcmd timeouts from the recorded history of similar commands.
+
+        Args:
+            store_path: JSON file holding command durations, shared across runs.
+            kwargs: Options passed to roast.timeouts.TimeoutModel.
+
+        Returns:
+            TimeoutModel instance in use.
+        """
+        self.timeout_model = TimeoutModel(store_path, **kwargs)
+        return self.timeout_model
+
+    def put_file(self, src_file: str, dest_file: str, **kwargs) -> dict:
+        """Transfers a file to the console host in-band, see roast.console_transfer.console_put.
+
+        Args:
+            src_file: Path to file on host.
+            dest_file: Path to file on target.
+
+        Returns:
+            dict: Transfer statistics.
+        """
+        return console_put(self, src_file, dest_file, **kwargs)
+
+    def reconnect(self, retries: int = 5, base_delay: float = 1.0) -> None:
+        """Re-establishes a lost console and restores its prompt and shell setup.
+
+        Args:
+            retries: Login attempts. Defaults to 5.
+            base_delay: Backoff delay of the first retry in seconds. Defaults to 1.0.
+
+        Raises:
+            ConnectionError: When the console can not be re-established.
+        """
+        start = time.monotonic()
+        with self._lock:
+            prompt = self.prompt
+            if self.terminal is not None:
+                self.terminal.close(force=True)
+            for attempt in range(retries):
+                try:
+                    self._setup_ssh(self._userid, self._password)
+                    self._in_flight = False
+                    self.prompt = prompt
+                    self._install_readers()
+                    self._setup_init()
+                    break
+                except Exception as e:
+                    self.log.info(f"Reconnect to {self.ip} failed: {e}")
+                    if attempt == retries - 1:
+                        raise ConnectionError(f"Failed to reconnect to {self.ip}")
+                    time.sleep(backoff_delay(attempt, base_delay))
+            downtime = time.monotonic() - start
+            self.reconnects += 1
+            self.downtime += downtime
+            self._last_activity = time.monotonic()
+        self.log.info(
+            f"Reconnected to {self.ip} in {downtime:.1f}s "
+            f"(reconnects: {self.reconnects}, downtime: {self.downtime:.1f}s)"
+        )
+
+    def _probe(self, timeout: float) -> bool:
+        # Only a closed console is lost, a slow prompt is not
+        if self.terminal is None or not self.terminal.isalive():
+            return False
+        # Keep the match of the last command for output() and search()
+        terminal = self.terminal
+        saved = (terminal.before, terminal.after, terminal.match)
+        try:
+            terminal.sendline("")
+            terminal.expect(self.prompt, timeout=timeout)
+        except pexpect.EOF:
+            return False
+        except pexpect.TIMEOUT:
+            self.log.info(f"Keepalive on {self.ip} timed out")
+        finally:
+            terminal.before, terminal.after, terminal.match = saved
+        return True
+
+    def _keepalive_loop(self, interval: float, probe_timeout: float) -> None:
+        while not self._keepalive_stop.wait(interval):
+            if time.monotonic() - self._last_activity < interval:
+                continue
+            # Skip the probe while the console is in use
+            if not self._lock.acquire(blocking=False):
+                continue
+            try:
+                # A command sent without its expect yet, such as runcmd_async
+                if self._in_flight:
+                    continue
+                self._last_activity = time.monotonic()
+                if not self._probe(probe_timeout):
+                    self.log.info(f"Console to {self.ip} lost")
+                    if self.auto_reconnect:
+                        self.reconnect()
+            except Exception as e:
+                self.log.error(f"Keepalive on {self.ip} failed: {e}")
+            finally:
+                self._lock.release()
+
+    def start_keepalive(
+        self,
+        interval: float = 60,
+        probe_timeout: float = 10,
+        auto_reconnect: bool = True,
+    ) -> None:
+        """Probes the idle console periodically from a background thread.
+
+        The probe keeps ssh sessions from idling out and detects lost
+        consoles, it is skipped while a command awaits its expect. With
+        auto_reconnect the console is re-established when the probe hits
+        EOF, or by runcmd when it does, and the command is rerun.
+
+        Args:
+            interval: Seconds of inactivity between probes. Defaults to 60.
+            probe_timeout: Timeout for the prompt after a probe. Defaults to 10.
+            auto_reconnect: Reconnect lost consoles. Defaults to True.
+        """
+        self.stop_keepalive()
+        self.auto_reconnect = auto_reconnect
+        self._keepalive_stop = threading.Event()
+        self._keepalive = threading.Thread(
+            target=self._keepalive_loop,
+            args=(interval, probe_timeout),
+            name=f"keepalive-{self.ip}",
+            daemon=True,
+        )
+        self._keepalive.start()
+
+    def stop_keepalive(self) -> None:
+        """Stops the keepalive thread started with start_keepalive()."""
+        if self._keepalive_stop is not None:
+            self._keepalive_stop.set()
+            self._keepalive.join()
+            self._keepalive_stop = None
+
+    def health(self) -> dict:
+        """Returns console liveness, reconnect count and accumulated downtime."""
+        return {
+            "alive": self.terminal is not None and self.terminal.isalive(),
+            "reconnects": self.reconnects,
+            "downtime": self.downtime,
+        }
 
     def sync(self):
         self.runcmd("echo 'sync' | tr '[a-z]' '[A-Z]'", expected=["SYNC"])
 
     def exit(self):
+        self.stop_keepalive()
         if self.terminal:
             self.sendline("exit")
         time.sleep(3)
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """Exponential backoff with full jitter.
+
+    Args:
+        attempt: Zero based retry number.
+        base: Delay of the first retry in seconds. Defaults to 1.0.
+        cap: Maximum delay in seconds. Defaults to 30.0.
+
+    Returns:
+        Random delay between 0 and min(cap, base * 2 ** attempt).
+    """
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+def login_many(
+    log: logging.Logger,
+    targets: List[str],
+    userid: Optional[str] = None,
+    password: Optional[str] = None,
+    max_workers: int = 8,
+    retries: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 30.0,
+    slow_threshold: float = 60.0,
+    login_timeout: int = 30,
+    login_retries: int = 1,
+    **kwargs,
+) -> Tuple[Dict[str, Xexpect], Dict[str, dict]]:
+    """Opens ssh consoles to many targets concurrently.
+
+    Logins run on a bounded thread pool, failed attempts are retried with
+    exponential backoff and jitter so a rack of boards coming back from a
+    power event does not retry in lockstep. Each attempt is a single ssh
+    login bounded by login_timeout, so retries are paced by the backoff
+    rather than by the login's own retries.
+
+    Args:
+        log: Logger instance passed to every console.
+        targets: Target hostnames or ip addresses.
+        userid: Login user, uses password less ssh if None. Defaults to None.
+        password: Login password. Defaults to None.
+        max_workers: Maximum concurrent logins. Defaults to 8.
+        retries: Login attempts per target. Defaults to 5.
+        base_delay: Backoff delay of the first retry in seconds. Defaults to 1.0.
+        max_delay: Maximum backoff delay in seconds. Defaults to 30.0.
+        slow_threshold: Logins taking longer are reported slow. Defaults to 60.0.
+        login_timeout: Connect and prompt timeout of an attempt in seconds. Defaults to 30.
+        login_retries: Password login tries of an attempt. Defaults to 1.
+        kwargs: Additional Xexpect arguments.
+
+    Returns:
+        Consoles by target for successful logins and a summary by target
+        with status ("ok", "slow" or "unreachable"), attempts, duration and
+        last error.
+    """
+
+    def _login(target):
+        start = time.monotonic()
+        error = None
+        for attempt in range(retries):
+            try:
+                console = Xexpect(
+                    log,
+                    hostname=target,
+                    hostip=target,
+                    userid=userid,
+                    password=password,
+                    login_timeout=login_timeout,
+                    login_retries=login_retries,
+                    **kwargs,
+                )
+                duration = time.monotonic() - start
+                status = "slow" if duration > slow_threshold else "ok"
+                return target, console, status, attempt + 1, duration, None
+            except Exception as e:
+                error = str(e)
+                if attempt < retries - 1:
+                    time.sleep(backoff_delay(attempt, base_delay, max_delay))
+        duration = time.monotonic() - start
+        return target, None, "unreachable", retries, duration, error
+
+    consoles = {}
+    summary = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for target, console, status, attempts, duration, error in executor.map(
+            _login, targets
+        ):
+            if console is not None:
+                consoles[target] = console
+            summary[target] = {
+                "status": status,
+                "attempts": attempts,
+                "duration": duration,
+                "error": error,
+            }
+
+    slow = [t for t, s in summary.items() if s["status"] == "slow"]
+    unreachable = [t for t, s in summary.items() if s["status"] == "unreachable"]
+    log.info(f"Logged in to {len(consoles)} of {len(targets)} targets")
+    if slow:
+        log.warning(f"Slow logins: {', '.join(slow)}")
+    if unreachable:
+        log.error(f"Unreachable targets: {', '.join(unreachable)}")
+    return consoles, summary
@@ -7,6 +7,7 @@ import os
 import sys
 import pytest
 from shutil import rmtree
+from roast.replay import SessionRecorder
 
 sys.path.append(os.path.dirname(__file__))
 
@@ -16,3 +17,23 @@ def build_dir(tmpdir):
     buildDir = os.path.join(tmpdir, "build")
     yield buildDir
     rmtree(buildDir)
+
+
+@pytest.fixture
+def session(tmpdir):
+    path = str(tmpdir.join("session.jsonl.gz"))
+    recorder = SessionRecorder(path, hostname="board", prompt="root@board:~# ")
+    recorder.send_tap.write("uname -r\n")
+    recorder.read_tap.write("uname -r\r\n5.10.0-xilinx\r\n")
+    recorder.read_tap.write("root@board:~# ")
+    recorder.send_tap.write("cat /proc/version\n")
+    recorder.read_tap.write("Linux version 5.10.0\r\nroot@board:~# ")
+    recorder.close()
+    return path
+
+
+@pytest.fixture
+def empty_session(tmpdir):
+    path = str(tmpdir.join("empty.jsonl.gz"))
+    SessionRecorder(path, hostname="board", prompt="root@board:~# ").close()
+    return path
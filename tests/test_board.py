@@ -3,10 +3,19 @@
 # SPDX-License-Identifier: MIT
 #
 
+import gzip
+import json
+import time
+import logging
 import socket
+import hashlib
+import threading
 import pytest
-from roast.component.board.board import Board
-from roast.utils import register_plugin
+from roast.component.board.board import Board, BoardBase, start_fleet
+from roast.exceptions import FleetError
+from roast.xexpect import Xexpect
+from roast.boot_profile import BootProfiler
+from roast.utils import register_plugin, get_metrics_events, reset_metrics
 
 
 @pytest.fixture
@@ -29,3 +38,188 @@ def test_board_interface(b, mocker):
     assert b.driver.get_src_file == "c"
     assert b.driver.get_dest_path == "d"
     assert b.driver.reset
+
+
+def test_board_put_changed(b, mocker, tmpdir):
+    boot = tmpdir.join("boot.bin")
+    boot.write("boot")
+    image = tmpdir.join("Image")
+    image.write("image")
+    b.driver.target_console = mocker.Mock()
+    b.driver.target_console.output.return_value = (
+        f"{hashlib.md5(b'boot').hexdigest()}  /boot/boot.bin"
+    )
+    changed = b.put_changed(
+        [str(boot), str(image)], "/boot", str(tmpdir.join("hashes.json"))
+    )
+    assert changed == [str(image)]
+    assert b.driver.put_src_file == str(image)
+    assert b.driver.put_dest_path == "/boot"
+
+
+def test_board_transfer_metrics(b, tmpdir):
+    reset_metrics()
+    src = tmpdir.join("result.log")
+    src.write("x" * 100)
+    b.put(str(src), "/tmp")
+    b.get("/tmp/result.log", str(tmpdir))
+    put, get = get_metrics_events()
+    assert (put["kind"], put["target"], put["bytes"]) == ("put", "dummy_board", 100)
+    assert (get["kind"], get["bytes"]) == ("get", 100)
+    reset_metrics()
+
+
+def _fleet(mocker, failing=(), slow=()):
+    def _board(name):
+        board = mocker.Mock()
+        if name in failing:
+            board.start.side_effect = RuntimeError(f"{name} did not boot")
+        elif name in slow:
+            board.start.side_effect = lambda: time.sleep(0.5)
+        return board
+
+    return {f"board{n}": _board(f"board{n}") for n in range(4)}
+
+
+def test_start_fleet(mocker):
+    progress = []
+    boards = _fleet(mocker)
+    summary = start_fleet(boards, on_progress=lambda n, e: progress.append(e["status"]))
+    assert all(entry["status"] == "ready" for entry in summary.values())
+    assert all(board.start.called for board in boards.values())
+    assert progress.count("starting") == progress.count("ready") == 4
+
+
+def test_start_fleet_quorum(mocker):
+    boards = _fleet(mocker, failing=["board0"], slow=["board3"])
+    summary = start_fleet(boards, quorum=2)
+    assert summary["board0"]["status"] == "failed"
+    assert "did not boot" in summary["board0"]["error"]
+    assert summary["board3"]["status"] in ("pending", "starting")
+
+
+def test_start_fleet_quorum_failed(mocker):
+    boards = _fleet(mocker, failing=["board0", "board1"])
+    with pytest.raises(FleetError, match="failed: board0, board1") as err:
+        start_fleet(boards, quorum=3, max_workers=1)
+    assert err.value.summary["board2"]["status"] in ("pending", "starting", "ready")
+
+
+class _ReplaySerial:
+    def __init__(self, console):
+        self.console = console
+        self.expect = console.expect
+
+    def profile_boot(self, milestones=None):
+        return BootProfiler(milestones).attach(self.console)
+
+
+def test_board_power_cycle(b, mocker, tmpdir):
+    path = str(tmpdir.join("boot.jsonl.gz"))
+    with gzip.open(path, "wt") as fd:
+        fd.write(json.dumps({"version": 1, "hostname": "zcu102", "prompt": "# "}))
+        fd.write("\n" + json.dumps([0.1, "r", "U-Boot 2021.01\r\n"]))
+        fd.write("\n" + json.dumps([0.2, "r", "Booting Linux on physical CPU\r\n"]))
+        fd.write("\n" + json.dumps([0.3, "r", "zcu102 login: "]) + "\n")
+    console = Xexpect.replay(logging.getLogger("roast"), path)
+    console.terminal.buffer = "zcu102 login: "
+    b.driver.serial = _ReplaySerial(console)
+    b.driver.relay = mocker.Mock()
+    reset_metrics()
+    result = b.driver.power_cycle(off_time=0, timeout=5)
+    b.driver.relay.disconnect.assert_called_once_with()
+    b.driver.relay.connect.assert_called_once_with()
+    assert list(result["profile"]) == ["bootloader", "kernel", "login"]
+    assert result["latency"] == result["profile"]["login"] > 0
+    (event,) = get_metrics_events()
+    assert (event["kind"], event["target"]) == ("reset", "zcu102")
+
+
+def test_board_resolve_target_ip(b, mocker):
+    BoardBase._target_ip_cache.clear()
+    b.driver.serial = mocker.Mock()
+    b.driver.serial.hostname = "zcu102-serial"
+    b.driver.serial.search.return_value = "10.0.0.2"
+    mock_probe = mocker.patch.object(BoardBase, "_probe_ip", return_value=True)
+    b.driver._get_target_ip()
+    assert b.driver.target_ip == "10.0.0.2"
+    b.driver.serial.sendline.assert_called_once_with("ifconfig eth0")
+    assert b.driver.resolve_target_ip() == "10.0.0.2"
+    assert b.driver.serial.sendline.call_count == 1
+    mock_probe.assert_called_once_with("10.0.0.2", 22, 1.0)
+
+    mock_probe.return_value = False
+    b.driver.serial.search.return_value = "10.0.0.3"
+    assert b.driver.resolve_target_ip() == "10.0.0.3"
+    b.driver.config = {"target_interface": "eth1"}
+    b.driver.resolve_target_ip()
+    b.driver.serial.sendline.assert_called_with("ifconfig eth1")
+
+
+def test_board_resolve_target_ip_per_board(b, mocker):
+    BoardBase._target_ip_cache.clear()
+    mocker.patch.object(BoardBase, "_probe_ip", return_value=True)
+    boards = []
+    for n in range(2):
+        board = Board(board_type="dummy_board").driver
+        board.host = "rack"
+        board.serial = mocker.Mock()
+        board.serial.hostname = "rack"
+        board.serial.config = {"com": f"/dev/ttyUSB{n}"}
+        board.serial.search.return_value = f"10.0.0.{n + 2}"
+        boards.append(board)
+    # Boards sharing a serial host keep their own addresses
+    assert [board.resolve_target_ip() for board in boards] == ["10.0.0.2", "10.0.0.3"]
+    assert [board.resolve_target_ip() for board in boards] == ["10.0.0.2", "10.0.0.3"]
+    assert [board.serial.sendline.call_count for board in boards] == [1, 1]
+
+    # A named board is found again by name
+    boards[0].config = {"board": "zcu102-1"}
+    boards[0].resolve_target_ip()
+    board = Board(board_type="dummy_board").driver
+    board.config = {"board": "zcu102-1"}
+    board.serial = mocker.Mock()
+    assert board.resolve_target_ip() == "10.0.0.2"
+    assert not board.serial.sendline.called
+
+
+def test_board_put_get_many(b, mocker, tmpdir):
+    reset_metrics()
+    mock_put = mocker.patch.object(b.driver, "put")
+    mock_get = mocker.patch.object(b.driver, "get")
+    files = [tmpdir.join(f"f{n}") for n in range(3)]
+    for f in files:
+        f.write("data")
+    b.put_many([(str(f), "/tmp") for f in files])
+    assert sorted(c.args for c in mock_put.call_args_list) == [
+        (str(f), "/tmp") for f in files
+    ]
+    mock_get.side_effect = [None, IOError("no such file"), None]
+    with pytest.raises(IOError, match="no such file"):
+        b.get_many([(f"/tmp/r{n}.log", str(tmpdir)) for n in range(3)], max_workers=1)
+    assert mock_get.call_count == 3
+    put, get = get_metrics_events()
+    assert (put["kind"], put["files"], put["bytes"]) == ("put_many", 3, 12)
+    assert (get["kind"], get["status"]) == ("get_many", "failed")
+
+
+def test_board_put_many_thread_safe(b, mocker):
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def _put(src_file, dest_path):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+
+    mocker.patch.object(b.driver, "put", side_effect=_put)
+    manifest = [(f"f{n}", "/tmp") for n in range(4)]
+    # Transfers share the console unless the driver declares otherwise
+    b.put_many(manifest, max_workers=4)
+    assert peak[0] == 1
+    mocker.patch.object(b.driver, "transfer_thread_safe", True)
+    b.put_many(manifest)
+    assert peak[0] > 1
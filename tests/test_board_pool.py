@@ -0,0 +1,68 @@
+#
+# Copyright (c) 2020 Xilinx, Inc. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from roast.component.board.pool import BoardPool
+
+
+@pytest.fixture
+def pool(tmpdir):
+    return BoardPool(["zcu102-0", "zcu102-1"], str(tmpdir.join("pool.json")))
+
+
+def test_board_pool_lease(pool):
+    with pool.acquire() as first, pool.acquire() as second:
+        assert {first.name, second.name} == {"zcu102-0", "zcu102-1"}
+        with pytest.raises(TimeoutError):
+            pool.acquire(timeout=0)
+    status = pool.status()
+    assert all(board["holder"] is None for board in status.values())
+    assert [board["leases"] for board in status.values()] == [1, 1]
+
+
+def test_board_pool_least_used(pool):
+    with pool.acquire() as lease:
+        name = lease.name
+    with pool.acquire() as lease:
+        assert lease.name != name
+
+
+def test_board_pool_parallel(pool):
+    def _work(_):
+        with pool.acquire(poll=0.01) as lease:
+            status = pool.status()
+            assert status[lease.name]["holder"] == lease.holder
+            time.sleep(0.02)
+            return lease.name
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        names = list(executor.map(_work, range(8)))
+    assert sorted(set(names)) == ["zcu102-0", "zcu102-1"]
+    assert sum(board["leases"] for board in pool.status().values()) == 8
+
+
+def test_board_pool_expiry(tmpdir):
+    pool = BoardPool(["vck190"], str(tmpdir.join("pool.json")), lease_timeout=0)
+    lease = pool.acquire()
+    reclaimed = pool.acquire(timeout=0)
+    with pytest.raises(RuntimeError):
+        lease.renew()
+    reclaimed.release()
+    lease.release()
+    assert pool.status()["vck190"]["holder"] is None
+
+
+def test_board_pool_health(tmpdir):
+    pool = BoardPool(["vck190"], str(tmpdir.join("pool.json")), max_failures=2)
+    for _ in range(2):
+        with pool.acquire() as lease:
+            lease.healthy = False
+    assert not pool.status()["vck190"]["healthy"]
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0)
+    pool.mark_healthy("vck190")
+    pool.acquire(timeout=0).release()
@@ -0,0 +1,84 @@
+#
+# Copyright (c) 2020 Xilinx, Inc. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+
+import logging
+from roast.xexpect import Xexpect
+from roast.replay import SessionRecorder
+from roast.boot_profile import BootProfiler, compare_profiles, load_profiles
+
+
+def boot(profiler):
+    profiler.write("U-Boot 2021.01 (Jan 01 2021)\r\n")
+    profiler.write("Starting ker")
+    profiler.write("nel ...\r\n[    0.000000] Booting Linux on physical CPU 0x0\r\n")
+    profiler.write("[    2.100000] Run /sbin/init as init process\r\n")
+    profiler.write(b"xilinx-zcu102 login: ")
+
+
+def test_boot_profiler():
+    profiler = BootProfiler()
+    profiler.write("U-Boot 2021.01\r\n")
+    assert list(profiler.profile) == ["bootloader"]
+    assert profiler.missing == ["kernel", "init", "login"]
+    assert not profiler.wait(0)
+    boot(profiler)
+    assert list(profiler.profile) == ["bootloader", "kernel", "init", "login"]
+    assert profiler.wait(0)
+    profiler.start()
+    assert profiler.profile == {}
+
+
+def test_boot_profiler_custom_milestones():
+    profiler = BootProfiler(
+        [("fsbl", r"Xilinx Zynq MP First Stage"), ("login", "login:")]
+    )
+    boot(profiler)
+    assert list(profiler.profile) == ["login"]
+    assert profiler.missing == ["fsbl"]
+
+
+def test_boot_profile_history(tmpdir):
+    store = str(tmpdir.join("boot.json"))
+    for _ in range(3):
+        profiler = BootProfiler()
+        boot(profiler)
+        profiler.save(store, label="zcu102")
+    assert len(load_profiles(store)) == 3
+    result = profiler.compare(store, label="zcu102")
+    assert not any(entry["regression"] for entry in result.values())
+    assert profiler.compare(store, label="vck190") == {
+        name: {"baseline": None, "current": t, "delta": None, "regression": False}
+        for name, t in profiler.profile.items()
+    }
+
+
+def test_compare_profiles():
+    result = compare_profiles(
+        {"kernel": 2.0, "login": 10.0, "init": 4.0},
+        {"kernel": 2.1, "login": 12.0},
+    )
+    assert result["kernel"] == {
+        "baseline": 2.0,
+        "current": 2.1,
+        "delta": 0.1,
+        "regression": False,
+    }
+    assert result["login"]["regression"]
+    assert result["init"]["regression"]
+
+
+def test_boot_profiler_attach(tmpdir):
+    path = str(tmpdir.join("boot.jsonl.gz"))
+    recorder = SessionRecorder(path, hostname="board", prompt="root@board:~# ")
+    recorder.send_tap.write("reboot\n")
+    recorder.read_tap.write("reboot\r\nBooting Linux on physical CPU 0x0\r\n")
+    recorder.read_tap.write("board login: ")
+    recorder.close()
+    x = Xexpect.replay(logging.getLogger("roast"), path, speed=0)
+    profiler = BootProfiler().attach(x)
+    x.runcmd("reboot", expected="login:", wait_for_prompt=False)
+    assert list(profiler.profile) == ["kernel", "login"]
+    profiler.detach()
+    assert profiler.console is None
@@ -4,6 +4,7 @@
 #
 
 import os
+import time
 import pkg_resources
 from roast.component.scenario import scenario
 from roast.component.system import SystemBase
@@ -68,3 +69,132 @@ def test_component_interface(request):
 
     results = scn.run_component()
     assert results[ts_name] == True
+
+
+class TimedSystem(SystemBase):
+    builds = []
+
+    def configure(self):
+        pass
+
+    def build(self):
+        time.sleep(0.1)
+        TimedSystem.builds.append(type(self).__name__)
+        return type(self).__name__
+
+
+class Kernel(TimedSystem):
+    pass
+
+
+class DeviceTree(TimedSystem):
+    pass
+
+
+class Rootfs(TimedSystem):
+    depends_on = ["kernel"]
+
+
+class Image(TimedSystem):
+    depends_on = ["rootfs", "dtb", "missing"]
+
+
+class Broken(TimedSystem):
+    def build(self):
+        raise RuntimeError("build failed")
+
+
+def _scenario(names, workers):
+    for name, cls in [
+        ("kernel", "Kernel"),
+        ("dtb", "DeviceTree"),
+        ("rootfs", "Rootfs"),
+        ("image", "Image"),
+        ("broken", "Broken"),
+    ]:
+        register_plugin(name, "system", f"test_component:{cls}")
+    scn = scenario({"roast.system": names, "roast.build_workers": workers})
+    TimedSystem.builds = []
+    return scn
+
+
+def test_component_build_dag():
+    scn = _scenario(["image", "rootfs", "dtb", "kernel"], workers=2)
+    results = scn.build_component()
+    assert list(results) == ["image", "rootfs", "dtb", "kernel"]
+    assert results["rootfs"] == "Rootfs"
+    assert TimedSystem.builds.index("Kernel") < TimedSystem.builds.index("Rootfs")
+    assert TimedSystem.builds[-1] == "Image"
+    assert scn.critical_path == ["kernel", "rootfs", "image"]
+    timings = scn.build_timings
+    assert set(timings) == {"image", "rootfs", "dtb", "kernel"}
+    assert timings["dtb"]["start"] < timings["kernel"]["end"]
+    assert timings["rootfs"]["start"] >= timings["kernel"]["end"]
+
+
+def test_component_build_dag_failure():
+    scn = _scenario(["broken", "kernel"], workers=1)
+    scn.sys("kernel").depends_on = ["broken"]
+    assert scn.build_component() == {}
+    assert TimedSystem.builds == []
+
+
+class CachedSystem(SystemBase):
+    builds = 0
+
+    def configure(self):
+        pass
+
+    def _output(self):
+        return os.path.join(self.config["buildDir"], "images", "Image")
+
+    def build_inputs(self):
+        return [self.config["src"]]
+
+    def build_outputs(self):
+        return [self._output()]
+
+    def build(self):
+        CachedSystem.builds += 1
+        os.makedirs(os.path.dirname(self._output()), exist_ok=True)
+        with open(self.config["src"]) as src, open(self._output(), "w") as dest:
+            dest.write(src.read().upper())
+        return {"image": "Image"}
+
+
+def test_component_build_cache(request, build_dir, tmpdir):
+    register_plugin("cached", "system", "test_component:CachedSystem")
+    src = tmpdir.join("kernel.c")
+    src.write("kernel")
+    config = generate_conf(
+        request.config.rootdir.strpath, request.node.fspath, request.node.name
+    )
+    config["roast.system"] = ["cached"]
+    config["roast.build_cache"] = True
+    config["buildDir"] = build_dir
+    config["src"] = str(src)
+    config["cached"] = {"defconfig": "xilinx_defconfig", "password": "root"}
+    output = os.path.join(build_dir, "images", "Image")
+    CachedSystem.builds = 0
+
+    assert scenario(config).build_component() == {"cached": {"image": "Image"}}
+    os.remove(output)
+    scn = scenario(config)
+    assert scn.build_component() == {"cached": {"image": "Image"}}
+    assert scn.build_timings["cached"]["cached"]
+    assert CachedSystem.builds == 1
+    with open(output) as fd:
+        assert fd.read() == "KERNEL"
+
+    src.write("kernel v2")
+    scenario(config).build_component()
+    config["cached.defconfig"] = "other_defconfig"
+    scenario(config).build_component()
+    assert CachedSystem.builds == 3
+    # Secrets are masked when printed but not when fingerprinted
+    config["cached.password"] = "secret"
+    scenario(config).build_component()
+    assert CachedSystem.builds == 4
+    config["roast.build_cache"] = False
+    scenario(config).build_component()
+    assert CachedSystem.builds == 5
@@ -0,0 +1,60 @@
+#
+# Copyright (c) 2020 Xilinx, Inc. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+
+import os
+import logging
+import pytest
+from roast.xexpect import Xexpect
+from roast.console_transfer import console_put
+
+
+@pytest.fixture
+def console():
+    return Xexpect(logging.getLogger("roast"), non_interactive=False)
+
+
+@pytest.fixture
+def payload(tmpdir):
+    src = tmpdir.join("payload.bin")
+    src.write_binary(os.urandom(5000))
+    return str(src)
+
+
+def test_console_put(console, payload, tmpdir):
+    dest = str(tmpdir.join("dest.bin"))
+    stats = console.put_file(payload, dest, chunk_size=512, window=3)
+    with open(payload, "rb") as a, open(dest, "rb") as b:
+        assert a.read() == b.read()
+    assert stats["size"] == 5000
+    assert stats["sent_bytes"] == 5000
+    assert stats["resumed_from"] == 0
+    assert stats["throughput"] > 0
+
+
+def test_console_put_resume(console, payload, tmpdir):
+    dest = str(tmpdir.join("dest.bin"))
+    with open(payload, "rb") as a, open(dest, "wb") as b:
+        b.write(a.read()[:2100])
+    stats = console_put(console, payload, dest, chunk_size=1024)
+    with open(payload, "rb") as a, open(dest, "rb") as b:
+        assert a.read() == b.read()
+    assert stats["resumed_from"] == 2048
+    assert stats["sent_bytes"] == 5000 - 2048
+
+
+def test_console_put_resume_longer(console, payload, tmpdir):
+    dest = str(tmpdir.join("dest.bin"))
+    with open(payload, "rb") as a, open(dest, "wb") as b:
+        b.write(a.read() + b"stale tail")
+    stats = console_put(console, payload, dest, chunk_size=1000)
+    with open(payload, "rb") as a, open(dest, "rb") as b:
+        assert a.read() == b.read()
+    assert stats["resumed_from"] == 5000
+    assert stats["sent_bytes"] == 0
+
+
+def test_console_put_chunk_size(console, payload):
+    with pytest.raises(ValueError, match="chunk_size"):
+        console_put(console, payload, "dest", chunk_size=4096)
@@ -4,7 +4,8 @@
 #
 
 import os
-from roast.utils import read_json, write_json
+import hashlib
+from roast.utils import read_json, write_json, HashCache
 
 
 def test_json_read(tmpdir):
@@ -27,3 +28,24 @@ def test_json_read(tmpdir):
         "string": "value",
         "scientific": 800.0,
     }
+
+
+def test_hash_cache(tmpdir, mocker):
+    cache_file = str(tmpdir.join("cache", "hashes.json"))
+    image = tmpdir.join("rootfs.cpio")
+    image.write("rootfs")
+    md5 = hashlib.md5(b"rootfs").hexdigest()
+
+    cache = HashCache(cache_file)
+    assert cache.hash(str(image)) == md5
+    cache.save()
+    assert read_json(cache_file)[str(image)]["hash"] == md5
+
+    # Unchanged size and mtime are served from the persisted cache
+    mock_new = mocker.patch("hashlib.new")
+    assert HashCache(cache_file).hash(str(image)) == md5
+    mock_new.assert_not_called()
+    mocker.stopall()
+
+    image.write("rootfs2")
+    assert HashCache(cache_file).hash(str(image)) == hashlib.md5(b"rootfs2").hexdigest()
@@ -0,0 +1,107 @@
+#
+# Copyright (c) 2020 Xilinx, Inc. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+
+import json
+import pytest
+from roast.utils import (
+    add_metrics_sink,
+    remove_metrics_sink,
+    transfer_metrics,
+    get_metrics_events,
+    reset_metrics,
+    metrics_summary,
+    metrics_table,
+    JsonLinesSink,
+    MetricsSink,
+)
+
+
+class ListSink(MetricsSink):
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event):
+        self.events.append(event)
+
+
+@pytest.fixture
+def sink():
+    reset_metrics()
+    sink = ListSink()
+    add_metrics_sink(sink)
+    yield sink
+    remove_metrics_sink(sink)
+    reset_metrics()
+
+
+def test_transfer_metrics(sink):
+    with transfer_metrics("scp", target="board1", files=2, bytes=2048) as event:
+        event["retries"] += 1
+    with pytest.raises(ConnectionError):
+        with transfer_metrics("scp", target="board1", files=1, bytes=1024):
+            raise ConnectionError("lost connection")
+
+    assert [e["status"] for e in sink.events] == ["ok", "failed"]
+    assert sink.events[0]["retries"] == 1
+    assert sink.events[0]["duration"] >= 0
+    assert get_metrics_events() == sink.events
+
+    summary = metrics_summary()[("scp", "board1")]
+    assert summary["count"] == 2
+    assert summary["failures"] == 1
+    assert summary["files"] == 3
+    assert summary["bytes"] == 3072
+
+
+def test_metrics_table(sink):
+    with transfer_metrics("rsync", target="/nfs", bytes=2**20):
+        pass
+    table = metrics_table().splitlines()
+    assert table[0].split() == [
+        "kind",
+        "target",
+        "count",
+        "fail",
+        "files",
+        "MiB",
+        "retry",
+        "sec",
+        "MiB/s",
+    ]
+    assert table[1].split()[:6] == ["rsync", "/nfs", "1", "0", "0", "1.00"]
+
+
+def test_json_lines_sink(sink, tmpdir):
+    path = str(tmpdir.join("metrics.jsonl"))
+    json_sink = JsonLinesSink(path)
+    add_metrics_sink(json_sink)
+    with transfer_metrics("put", target="board1", files=1, bytes=10):
+        pass
+    remove_metrics_sink(json_sink)
+    with open(path) as fd:
+        event = json.loads(fd.readline())
+    assert event["kind"] == "put"
+    assert event["bytes"] == 10
+
+
+def test_failing_sink(sink):
+    class BrokenSink(MetricsSink):
+        def emit(self, event):
+            raise IOError("disk full")
+
+    broken = BrokenSink()
+    add_metrics_sink(broken)
+    with transfer_metrics("get"):
+        pass
+    remove_metrics_sink(broken)
+    assert len(sink.events) == 1
+
+
+def test_metrics_sink_abstract():
+    class NoEmitSink(MetricsSink):
+        pass
+
+    with pytest.raises(TypeError):
+        NoEmitSink()
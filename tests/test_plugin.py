@@ -12,7 +12,10 @@ except ImportError:
 
 import pytest
 from stevedore import ExtensionManager
-from roast.utils import register_plugin
+from stevedore.driver import DriverManager
+from stevedore.exception import NoMatches
+from roast.utils import register_plugin, load_driver, load_extensions
+from roast.utils.plugin import _plugin_cache
 from roast.serial import SerialBase
 from roast.component.board.board import BoardBase
 from roast.exceptions import PluginError
@@ -82,3 +85,33 @@ def test_register_plugin_namespace_exception():
         PluginError, match="Unable to load plugin my_serial, serial, mynamespace"
     ):
         register_plugin("my_serial", "serial", "mynamespace")
+
+
+def test_load_driver_cache(mocker):
+    register_plugin("dummy_board", "board", "test_plugin:DummyBoard")
+    load_driver("roast.board", "dummy_board")
+    mock_manager = mocker.patch("roast.utils.plugin.driver.DriverManager")
+    mock_manager.make_test_instance = DriverManager.make_test_instance
+    b1 = load_driver("roast.board", "dummy_board")
+    b2 = load_driver("roast.board", "dummy_board")
+    assert not mock_manager.called
+    assert isinstance(b1.driver, DummyBoard)
+    assert b1.driver is not b2.driver
+
+
+def test_load_driver_invalidate():
+    register_plugin("cached_board", "board", "test_plugin:DummyBoard")
+    load_driver("roast.board", "cached_board")
+    assert ("roast.board", "cached_board") in _plugin_cache
+    register_plugin("cached_board", "board", "test_plugin:DummyBoard")
+    assert ("roast.board", "cached_board") not in _plugin_cache
+    with pytest.raises(NoMatches):
+        load_driver("roast.board", "unknown_board")
+
+
+def test_load_extensions():
+    register_plugin("dummy_board", "board", "test_plugin:DummyBoard")
+    register_plugin("other_board", "board", "test_plugin:DummyBoard")
+    mgr = load_extensions("roast.board", ["other_board", "missing", "dummy_board"])
+    assert mgr.names() == ["other_board", "dummy_board"]
+    assert isinstance(mgr["dummy_board"].obj, DummyBoard)
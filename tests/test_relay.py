@@ -4,7 +4,7 @@
 #
 
 import pytest
-from roast.component.relay import Relay
+from roast.component.relay import Relay, RelayFleet
 
 
 def test_relay_interface(mocker):
@@ -17,3 +17,34 @@ def test_relay_interface(mocker):
     r.reconnect(7)
     assert r.driver.reconnected == True
     assert r.driver.seconds == 7
+
+
+def test_relay_state_cache(mocker):
+    r = Relay(relay_type=None)
+    mock_disconnect = mocker.patch.object(r.driver, "disconnect")
+    r.disconnect()
+    r.disconnect()
+    assert mock_disconnect.call_count == 1
+    r.disconnect(force=True)
+    assert mock_disconnect.call_count == 2
+    r.reconnect(0)
+    assert r.state == "on"
+
+
+def test_relay_fleet(mocker):
+    mock_sleep = mocker.patch("roast.component.relay.time.sleep")
+    relays = {f"relay{n}": Relay(relay_type=None) for n in range(5)}
+    relays["relay4"].driver.connect = mocker.Mock(side_effect=OSError("no response"))
+    relays["relay0"].connect()
+    relays["relay0"].driver.connected = False
+    fleet = RelayFleet(relays, group_size=2, stagger=0.5)
+    assert fleet.groups == [["relay0", "relay1"], ["relay2", "relay3"], ["relay4"]]
+    result = fleet.power_cycle(seconds=3)
+    assert [c.args for c in mock_sleep.call_args_list] == [(3,), (0.5,), (0.5,)]
+    assert all(relay.driver.disconnected for relay in relays.values())
+    assert all(relays[f"relay{n}"].driver.connected for n in range(4))
+    assert [g["relays"] for g in result["groups"]] == fleet.groups
+    assert result["groups"][2]["failed"] == {"relay4": "no response"}
+    assert relays["relay4"].state == "off"
+    fleet.power_on()
+    assert relays["relay4"].driver.connect.call_count == 2
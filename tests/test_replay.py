@@ -0,0 +1,50 @@
+#
+# Copyright (c) 2020 Xilinx, Inc. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+
+import logging
+import pexpect
+from roast.xexpect import Xexpect
+from roast.replay import ReplaySpawn, load_session
+
+
+def test_load_session(session):
+    header, events = load_session(session)
+    assert header["hostname"] == "board"
+    assert header["prompt"] == "root@board:~# "
+    assert [e[1] for e in events] == ["s", "r", "r", "s", "r"]
+
+
+def test_replay_runcmd(session):
+    x = Xexpect.replay(logging.getLogger("roast"), session, speed=0)
+    assert x.prompt == "root@board:~# "
+    x.runcmd("uname -r")
+    assert "5.10.0-xilinx" in x.output()
+    x.runcmd("cat /proc/version", expected="Linux version")
+    assert x.terminal.mismatches == 0
+
+
+def test_replay_waits_for_send(session):
+    terminal = ReplaySpawn(session, speed=0)
+    assert terminal.expect([pexpect.TIMEOUT, "xilinx"], timeout=1) == 0
+    terminal.sendline("uname -r")
+    assert terminal.expect([pexpect.TIMEOUT, "xilinx"], timeout=1) == 1
+
+
+def test_replay_send_mismatch(session):
+    terminal = ReplaySpawn(session, speed=0)
+    terminal.sendline("uname -a")
+    assert terminal.mismatches == 1
+
+
+def test_record_replay_roundtrip(session, tmpdir):
+    path = str(tmpdir.join("copy.jsonl.gz"))
+    x = Xexpect.replay(logging.getLogger("roast"), session, speed=0)
+    x.record(path)
+    x.runcmd("uname -r")
+    x.stop_record()
+    header, events = load_session(path)
+    assert header["prompt"] == "root@board:~# "
+    assert events[0][1:] == ["s", "uname -r\n"]
+    assert "5.10.0-xilinx" in "".join(e[2] for e in events if e[1] == "r")
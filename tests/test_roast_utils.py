@@ -95,3 +95,140 @@ def test_copy_data_exception(tmpdir):
     copy_data(random_file, tmpdir)
     with pytest.raises(ValueError):
         copy_data(random_file, tmpdir, silent_discard=False)
+
+
+def test_rsync_resume(mocker):
+    mocker.patch("time.sleep")
+    console = mocker.Mock()
+    console.terminal.match.group.side_effect = ["0", "12", "0"]
+    type(console.terminal).before = mocker.PropertyMock(
+        side_effect=[
+            "Total transferred file size: 2,000,000 bytes\r\n",
+            "\r        600,000  30%   10.00MB/s    0:00:01"
+            "\r      1,200,000  60%   10.00MB/s    0:00:02\r\n"
+            "rsync: connection unexpectedly closed\r\n",
+            "Total transferred file size: 2,000,000\r\n"
+            "Literal data: 800,000 bytes\r\n"
+            "Total bytes sent: 800,512\r\n",
+        ]
+    )
+    stats = rsync_resume(console, "rootfs.ext4", "/nfs/staging")
+    dry_run, first, retry = console.runcmd.call_args_list
+    assert dry_run == mocker.call(
+        "rsync -an --stats rootfs.ext4 /nfs/staging --exclude='.git*';"
+        ' echo "rsync_rc=$?"',
+        expected=r"rsync_rc=(\d+)",
+        wait_for_prompt=False,
+        timeout=3000,
+    )
+    # Only retries append to partial files
+    assert first.args[0].startswith("rsync -a --partial --stats")
+    assert retry == mocker.call(
+        "rsync -a --partial --append-verify --stats --info=progress2 rootfs.ext4"
+        " /nfs/staging --exclude='.git*'; echo \"rsync_rc=$?\"",
+        expected=r"rsync_rc=(\d+)",
+        wait_for_prompt=False,
+        timeout=3000,
+    )
+    # The retry only appended what was missing
+    assert stats == {
+        "attempts": 2,
+        "size": 2000000,
+        "bytes_sent": 2000000,
+        "bytes_resent": 0,
+    }
+
+    # A partial file failing verification is sent again in full
+    console.terminal.match.group.side_effect = ["0", "12", "0"]
+    type(console.terminal).before = mocker.PropertyMock(
+        side_effect=[
+            "Total transferred file size: 2,000,000 bytes\r\n",
+            "\r      1,200,000  60%   10.00MB/s    0:00:02\r\n",
+            "Literal data: 2,000,000 bytes\r\n",
+        ]
+    )
+    stats = rsync_resume(console, "rootfs.ext4", "/nfs/staging")
+    assert stats["bytes_sent"] == 3200000
+    assert stats["bytes_resent"] == 1200000
+
+
+def test_rsync_resume_exception(mocker):
+    mocker.patch("time.sleep")
+    console = mocker.Mock()
+    console.terminal.before = ""
+    console.terminal.match.group.side_effect = ["0"] + ["30"] * 3
+    with pytest.raises(ConnectionError, match="after 3 attempts"):
+        rsync_resume(console, "src", "dest", retries=3)
+    assert console.runcmd.call_count == 1 + 3
+
+    # A failing dry run is retried rather than waited on
+    console.runcmd.reset_mock()
+    console.terminal.match.group.side_effect = None
+    console.terminal.match.group.return_value = "23"
+    with pytest.raises(ConnectionError, match="dry run failed 3 times"):
+        rsync_resume(console, "src", "dest", retries=3)
+    assert console.runcmd.call_count == 3
+
+
+def test_partition_shards():
+    sizes = {"rootfs": 70, "kernel": 40, "dtb": 5, "fw": 30, "apps": 25}
+    shards = partition_shards(sizes, 2)
+    assert shards == [["rootfs", "apps"], ["kernel", "fw", "dtb"]]
+    assert partition_shards({"a": 1}, 4) == [["a"]]
+
+
+def test_rsync_sharded(mocker, tmpdir):
+    src = tmpdir.mkdir("tree")
+    src.mkdir("big").join("f").write("x" * 100)
+    src.mkdir("small").join("f").write("x" * 10)
+    src.join("top").write("x" * 50)
+    src.mkdir(".git").join("HEAD").write("x" * 1000)
+    console = mocker.Mock()
+    console.terminal.before = (
+        "Number of regular files transferred: 3\r\n"
+        "Total transferred file size: 160 bytes\r\n"
+    )
+    console.terminal.match.group.side_effect = ["0", "0,0"]
+
+    result = rsync_sharded(console, f"{src}/", "/nfs/stage", shards=2)
+    assert result["shards"] == [["big"], ["top", "small"]]
+    assert result["estimate"] == 160
+    assert result["files"] == 3
+    assert result["returncodes"] == [0, 0]
+    dry_run, sync = console.runcmd.call_args_list
+    assert dry_run.args[0] == (
+        f"rsync -an --stats {src}/ /nfs/stage/ --exclude='.git*'; " 'echo "rsync_rc=$?"'
+    )
+    assert sync.args[0] == (
+        f"mkdir -p /nfs/stage; rsync -aq {src}/big /nfs/stage/ --exclude='.git*' & p0=$!; "
+        f"rsync -aq {src}/top {src}/small /nfs/stage/ --exclude='.git*' & p1=$!; "
+        'wait $p0; r0=$?; wait $p1; r1=$?; echo "shard_rc=$r0,$r1"'
+    )
+
+
+def test_rsync_sharded_exception(mocker, tmpdir):
+    src = tmpdir.mkdir("tree")
+    src.join("a").write("a")
+    src.join("b").write("b")
+    console = mocker.Mock()
+    console.terminal.before = ""
+    console.terminal.match.group.side_effect = ["0", "0,23"]
+    with pytest.raises(ConnectionError, match="rsync shards"):
+        rsync_sharded(console, str(src), "/nfs/stage", shards=2, by="count")
+    mocker.patch("time.sleep")
+    console.terminal.match.group.side_effect = None
+    console.terminal.match.group.return_value = "23"
+    with pytest.raises(ConnectionError, match="dry run failed"):
+        rsync_sharded(console, str(src), "/nfs/stage", shards=2)
+    with pytest.raises(ValueError, match="partitioning"):
+        rsync_sharded(console, str(src), "/nfs/stage", by="name")
+
+
+def test_rsync_sharded_empty(mocker, tmpdir):
+    src = tmpdir.mkdir("tree")
+    src.mkdir(".git")
+    console = mocker.Mock()
+    result = rsync_sharded(console, str(src), "/nfs/stage")
+    assert result["shards"] == []
+    assert result["files"] == 0
+    console.runcmd.assert_called_once_with("mkdir -p /nfs/stage", timeout=3000)
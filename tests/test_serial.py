@@ -3,11 +3,12 @@
 # SPDX-License-Identifier: MIT
 #
 
+import os
+import gzip
 import pytest
-from roast.serial import Serial
+from roast.serial import Serial, SerialCapture
 from roast.utils import register_plugin
 
-
 config = {
     "board_interface": "host_target",
     "remote_host": "remote_host",
@@ -33,6 +34,7 @@ def test_serial_interface(mocker):
     mock_xexpect.return_value._setup_init = mocker.Mock("setup_init")
     mock_xexpect.return_value.search = mocker.Mock("search")
     mock_xexpect.return_value.sync = mocker.Mock("sync")
+    mock_xexpect.return_value.put_file = mocker.Mock("put_file")
     s = Serial(serial_type="dummy_serial", config=config)
     assert isinstance(s, Serial)
     assert s.driver.config == config
@@ -48,3 +50,93 @@ def test_serial_interface(mocker):
 def test_serial_exception():
     with pytest.raises(Exception, match="No 'roast.serial' driver found"):
         Serial(serial_type="", config=config)
+
+
+def test_serial_capture(tmpdir):
+    path = str(tmpdir.join("serial.log"))
+    capture = SerialCapture(path)
+    capture.write("U-Boot 2021.01\r\nStarting ")
+    capture.write("kernel ...\r\n")
+    capture.close()
+    with open(path) as fd:
+        lines = fd.read().splitlines()
+    assert len(lines) == 2
+    assert lines[0].startswith("[") and lines[0].endswith("] U-Boot 2021.01")
+    assert lines[1].endswith("] Starting kernel ...")
+    assert capture.lines == 2
+
+
+def test_serial_capture_bytes_exit(tmpdir, mocker):
+    mock_register = mocker.patch("atexit.register")
+    mock_unregister = mocker.patch("atexit.unregister")
+    capture = SerialCapture(str(tmpdir.join("serial.log")))
+    # Closed at exit unless closed before
+    mock_register.assert_called_once_with(capture.close)
+    capture.write("temp: 45°C\n")
+    capture.write(b"\xc2\xb5s\n")
+    capture.close()
+    mock_unregister.assert_called_once_with(capture.close)
+    assert capture.bytes == 12 + 4
+
+
+def test_serial_capture_rotation(tmpdir):
+    path = str(tmpdir.join("serial.log"))
+    capture = SerialCapture(path, max_bytes=100, backup_count=2, compress=True)
+    for n in range(10):
+        capture.write(f"line {n} " + "x" * 40 + "\n")
+    capture.close()
+    assert capture.rotations == 5
+    assert sorted(os.listdir(str(tmpdir))) == [
+        "serial.log",
+        "serial.log.1.gz",
+        "serial.log.2.gz",
+    ]
+    with gzip.open(f"{path}.1.gz", "rt") as fd:
+        assert "line 9" in fd.read()
+    with gzip.open(f"{path}.2.gz", "rt") as fd:
+        assert "line 7" in fd.read()
+
+
+def test_serial_start_capture(mocker, tmpdir):
+    register_plugin("dummy_serial", "serial", "test_plugin:DummySerial")
+    mocker.patch("roast.serial.Xexpect")
+    s = Serial(serial_type="dummy_serial", config=config).driver
+    adapter = s.console.terminal.logfile
+    capture = s.start_capture(str(tmpdir.join("serial.log")))
+    s.console.add_reader.assert_called_once_with(capture)
+    assert s.console.terminal.logfile is None
+    s.stop_capture()
+    s.console.remove_reader.assert_called_once_with(capture)
+    assert s.console.terminal.logfile is adapter
+
+    serial = Serial(serial_type="dummy_serial", config=config)
+    capture = serial.driver.start_capture(str(tmpdir.join("serial.log")))
+    serial.exit()
+    assert serial.driver.capture is None
+    assert not capture._thread.is_alive()
+
+
+def test_serial_profile_boot(mocker):
+    register_plugin("dummy_serial", "serial", "test_plugin:DummySerial")
+    mocker.patch("roast.serial.Xexpect")
+    s = Serial(serial_type="dummy_serial", config=config).driver
+    profiler = s.profile_boot([("login", "login:")])
+    s.console.add_reader.assert_called_once_with(profiler)
+    profiler.write("board login: ")
+    assert profiler.wait(0)
+
+
+def test_serial_lazy_connect(mocker):
+    register_plugin("dummy_serial", "serial", "test_plugin:DummySerial")
+    mock_xexpect = mocker.patch("roast.serial.Xexpect")
+    s = Serial(
+        serial_type="dummy_serial", config=dict(config, serial_lazy_connect=True)
+    )
+    assert not s.driver.is_live
+    assert not mock_xexpect.called
+    s.driver.runcmd("uname -r")
+    mock_xexpect.return_value.runcmd.assert_called_once_with("uname -r")
+    assert s.driver.is_live and s.driver.connect
+    assert s.driver.sendline is mock_xexpect.return_value.sendline
+    s.driver.expect("login:")
+    assert mock_xexpect.call_count == 1
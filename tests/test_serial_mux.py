@@ -0,0 +1,72 @@
+#
+# Copyright (c) 2020 Xilinx, Inc. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+
+import atexit
+import logging
+import pytest
+import pexpect
+from types import SimpleNamespace
+from roast.xexpect import Xexpect
+from roast.serial_mux import SerialMux
+
+
+@pytest.fixture
+def serial():
+    port = pexpect.spawn("cat", encoding="utf-8", timeout=5)
+    console = Xexpect(logging.getLogger("roast"), hostname="board", terminal=port)
+    yield SimpleNamespace(console=console)
+    atexit.unregister(console.exit)
+    port.close(force=True)
+
+
+def test_serial_mux_fanout(serial):
+    port = serial.console.terminal
+    mux = SerialMux(serial)
+    assert serial.console.terminal is mux.primary
+    watcher = mux.subscribe()
+    serial.console.sendline("Kernel panic - not syncing")
+    serial.console.terminal.expect("Kernel panic")
+    watcher.expect("Kernel panic", timeout=5)
+    late = mux.subscribe(from_start=True)
+    late.expect("not syncing", timeout=5)
+    mux.close()
+    assert serial.console.terminal is port
+    assert mux.subscribers == []
+
+
+def test_serial_mux_open_console(serial):
+    mux = SerialMux(serial)
+    console = mux.open_console()
+    assert console.prompt == serial.console.prompt
+    serial.console.sendline("hello")
+    assert console.terminal.expect([pexpect.TIMEOUT, "hello"], timeout=5) == 1
+    mux.close()
+
+
+class FakePort(pexpect.spawnbase.SpawnBase):
+    def __init__(self, chunks):
+        super().__init__(timeout=1, encoding="utf-8")
+        self.chunks = list(chunks)
+
+    def read_nonblocking(self, size=1, timeout=-1):
+        if not self.chunks:
+            raise pexpect.EOF("done")
+        return self.chunks.pop(0)
+
+    def isalive(self):
+        return bool(self.chunks)
+
+
+def test_serial_mux_bounded_buffer():
+    port = FakePort(["a" * 10, "b" * 10, "c" * 10])
+    serial = SimpleNamespace(console=SimpleNamespace(terminal=port, ip="board"))
+    serial.console._install_readers = lambda: None
+    mux = SerialMux(serial, max_bytes=15, read_size=10)
+    mux._thread.join()
+    sub = mux.primary
+    assert sub.read_nonblocking(size=100, timeout=0) == "c" * 10
+    assert sub.dropped == 20
+    with pytest.raises(pexpect.EOF):
+        sub.read_nonblocking(size=100, timeout=0)
@@ -3,12 +3,29 @@
 # SPDX-License-Identifier: MIT
 #
 
+import os
+import io
+import time
 import socket
+import tarfile
+import hashlib
 import logging
 import pexpect
 from pexpect import pxssh
 import pytest
-from roast.ssh import ssh_login, ssh_login_user, pxssh_login, scp_file_transfer
+from roast.exceptions import ExpectError
+from roast.utils import get_metrics_events, reset_metrics
+from roast.ssh import (
+    SCP_FAILURES,
+    ssh_login,
+    ssh_login_user,
+    pxssh_login,
+    scp_file_transfer,
+    scp_parallel_transfer,
+    scp_delta_transfer,
+    target_hashes,
+    tar_stream_transfer,
+)
 
 
 @pytest.fixture
@@ -107,6 +124,24 @@ def test_ssh_login_user_exception(c, mocker):
             ssh_login_user(c, "user", "password")
 
 
+def test_ssh_login_user_single_try(c, mocker):
+    mock_sleep = mocker.patch("time.sleep")
+    mock_spawn = mocker.patch.object(pexpect, "spawn")
+    mock_spawn.return_value = mocker.Mock("spawn")
+    mock_spawn.return_value.expect = mocker.Mock("expect", return_value=0)
+    with pytest.raises(ConnectionError, match="Failed to establish ssh connection"):
+        ssh_login_user(c, "user", "password", timeout=5, retries=1, connect_timeout=5)
+    assert "-o ConnectTimeout=5 user@" in mock_spawn.call_args.args[0]
+    assert mock_spawn.return_value.expect.call_count == 1
+    assert mock_spawn.return_value.expect.call_args.kwargs["timeout"] == 5
+    mock_sleep.assert_not_called()
+
+    # Sending the password does not use up a try
+    mock_spawn.return_value.expect = mocker.Mock("expect", side_effect=[2, 4, None])
+    mock_spawn.return_value.sendline = mocker.Mock("sendline")
+    ssh_login_user(c, "user", "password", retries=1)
+
+
 def test_pxssh_login(c, mocker):
     mock_pxssh = mocker.patch.object(pxssh, "pxssh", return_value=mocker.Mock("pxssh"))
     mock_pxssh.return_value.login = mocker.Mock("login")
@@ -212,3 +247,299 @@ def test_scp_file_transfer_exception(c, mocker):
     c.expect = mocker.Mock("expect", return_value=3)
     with pytest.raises(ConnectionError, match="Failed to scp"):
         scp_file_transfer(c, timeout=10)
+
+
+@pytest.fixture
+def images(tmpdir):
+    images = tmpdir.mkdir("images")
+    images.join("boot.bin").write("b" * 10)
+    images.join("Image").write("i" * 300)
+    images.mkdir("dtbs").join("system.dtb").write("d" * 50)
+    return str(images)
+
+
+@pytest.fixture
+def parallel(c, mocker):
+    c.sync = mocker.Mock("sync")
+    c.sendline = mocker.Mock("sendline")
+    c.sendcontrol = mocker.Mock("sendcontrol")
+    c.output = mocker.Mock(
+        "output",
+        return_value="du -sb /images/* 2>/dev/null; true\r\n"
+        "300\t/images/Image\r\n10\t/images/boot.bin\r\n50\t/images/dtbs\r\n",
+    )
+    c.terminal = mocker.Mock()
+    c.config = {"images": "/images", "target_path": "/opt"}
+    return c
+
+
+def test_scp_parallel_transfer(parallel, mocker):
+    reset_metrics()
+    c = parallel
+    c.expect = mocker.Mock("expect", side_effect=[0, 0, 0, 1, 0])
+    c.terminal.match.groups.side_effect = [
+        ("0", "0", "1000000000", "3000000000"),
+        ("2", "1", "1000000000", "2000000000"),
+        ("1", "0", "2000000000", "2500000000"),
+    ]
+
+    result = scp_parallel_transfer(c, target_ip="ip", max_workers=2, timeout=10)
+    # Files are listed on the console's host
+    c.runcmd.assert_called_once_with("du -sb /images/* 2>/dev/null; true", timeout=10)
+    cmd = c.sendline.call_args.args[0]
+    scp = (
+        "scp -r -q -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null "
+        "-o BatchMode=yes"
+    )
+    # Largest first into the lightest of two lanes
+    lanes = cmd.split(") &")
+    assert len(lanes) == 3
+    assert f"{scp} /images/Image root@ip:/opt < /dev/null;" in lanes[0]
+    assert lanes[1].index("/images/dtbs") < lanes[1].index("/images/boot.bin")
+    assert cmd.endswith(' wait); echo "scp_done=$?"')
+    assert c.expect.call_args_list[0].args[0] == SCP_FAILURES
+    assert result["bytes"] == 360
+    assert result["files"]["/images/Image"]["duration"] == 2.0
+    assert result["files"]["/images/dtbs"]["bytes"] == 50
+    assert [e["retries"] for e in get_metrics_events()] == [0, 1, 0]
+
+
+def test_scp_parallel_transfer_exception(parallel, mocker):
+    c = parallel
+    c.expect = mocker.Mock("expect", side_effect=[0, 1, 0])
+    # Five failed tries of a file
+    c.terminal.match.groups.return_value = ("1", "5", "0", "0")
+    with pytest.raises(ConnectionError, match="Failed to scp /images/boot.bin"):
+        scp_parallel_transfer(c, timeout=10)
+
+    # Fatal failures stop the lanes at once
+    c.expect = mocker.Mock(
+        "expect", side_effect=[ExpectError("No space left on device"), 0]
+    )
+    with pytest.raises(ConnectionError, match="No space left on device"):
+        scp_parallel_transfer(c, timeout=10)
+    c.sendcontrol.assert_called_once_with("c")
+
+    c.output.return_value = ""
+    with pytest.raises(ConnectionError, match="No such file"):
+        scp_parallel_transfer(c, timeout=10)
+
+
+def test_scp_file_transfer_max_workers(c, mocker, images):
+    mock_parallel = mocker.patch("roast.ssh.scp_parallel_transfer")
+    c.config = {"images": images, "target_path": "/opt"}
+    scp_file_transfer(c, images=f"{images}/*", target_ip="ip", max_workers=4)
+    mock_parallel.assert_called_once_with(
+        c,
+        f"{images}/*",
+        None,
+        "ip",
+        proxy_server=None,
+        user="root",
+        timeout=3000,
+        max_workers=4,
+    )
+
+    # Password logins fall back to a single scp
+    mock_parallel.side_effect = ConnectionError("Failed to scp: Permission denied")
+    c.sync = mocker.Mock("sync")
+    c.sendline = mocker.Mock("sendline")
+    c.prompt = "#"
+    c.expect = mocker.Mock("expect", side_effect=[0, 2])
+    c._exit_non_zero_return = mocker.Mock("_exit_non_zero_return", return_value=0)
+    scp_file_transfer(c, images=f"{images}/*", target_ip="ip", max_workers=4)
+    assert c.sendline.call_args_list[0].args[0].startswith("scp -r -q")
+    c.sendline.assert_called_with("root")
+
+    mock_parallel.side_effect = ConnectionError("Failed to scp: No space left")
+    with pytest.raises(ConnectionError, match="No space left"):
+        scp_file_transfer(c, images=f"{images}/*", target_ip="ip", max_workers=4)
+
+
+def test_target_hashes(mocker):
+    console = mocker.Mock()
+    console.output.return_value = (
+        "md5sum /a /b /c 2>/dev/null; true\r\n" f"{'1' * 32}  /a\r\n{'2' * 32}  /b\r\n"
+    )
+    assert target_hashes(console, ["/a", "/b", "/c"]) == {
+        "/a": "1" * 32,
+        "/b": "2" * 32,
+    }
+    console.runcmd.assert_called_once_with(
+        "md5sum /a /b /c 2>/dev/null; true", timeout=200
+    )
+
+    console.runcmd.reset_mock()
+    target_hashes(console, ["/aaaa", "/bbbb", "/cccc"], max_cmd_len=12)
+    assert console.runcmd.call_count == 2
+
+
+def test_scp_delta_transfer(c, mocker, images, tmpdir):
+    mock_scp = mocker.patch("roast.ssh.scp_file_transfer")
+    target = mocker.Mock()
+    target.output.return_value = "\n".join(
+        [
+            f"{hashlib.md5(b'b' * 10).hexdigest()}  /lib/firmware/boot.bin",
+            f"{hashlib.md5(b'd' * 50).hexdigest()}  /lib/firmware/dtbs/system.dtb",
+            f"{hashlib.md5(b'old').hexdigest()}  /lib/firmware/Image",
+        ]
+    )
+    c.config = {"images": images, "target_path": "/lib/firmware"}
+    changed = scp_delta_transfer(
+        c, target, target_ip="ip", cache_file=str(tmpdir.join("hashes.json"))
+    )
+    assert changed == [f"{images}/Image"]
+    mock_scp.assert_called_once_with(
+        c,
+        images=f"{images}/Image",
+        target_path="/lib/firmware",
+        target_ip="ip",
+        proxy_server=None,
+        user="root",
+        password="root",
+        timeout=3000,
+    )
+
+    target.output.return_value = ""
+    mock_scp.reset_mock()
+    changed = scp_delta_transfer(
+        c, target, target_ip="ip", cache_file=str(tmpdir.join("hashes.json"))
+    )
+    assert len(changed) == 3
+    target.runcmd.assert_called_with("mkdir -p /lib/firmware/dtbs")
+    assert mock_scp.call_count == 2
+
+
+class _Stdin(io.BytesIO):
+    def close(self):
+        self.data = self.getvalue()
+
+
+@pytest.fixture
+def popen(mocker):
+    popen = mocker.patch("roast.ssh.subprocess.Popen")
+    proc = popen.return_value.__enter__.return_value
+    proc.stdin = _Stdin()
+    proc.stdout = io.BytesIO(b"")
+    proc.returncode = 0
+    return popen
+
+
+def test_tar_stream_transfer(popen, images):
+    stats = tar_stream_transfer(images, "/opt/tests", "ip", compression="gz")
+    cmd = popen.call_args.args[0]
+    assert cmd[-2:] == ["root@ip", "mkdir -p /opt/tests && tar -xzf - -C /opt/tests"]
+    data = popen.return_value.__enter__.return_value.stdin.data
+    with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as tar:
+        assert sorted(tar.getnames()) == [
+            "Image",
+            "boot.bin",
+            "dtbs",
+            "dtbs/system.dtb",
+        ]
+    assert stats["files"] == 3
+    assert stats["bytes"] == len(data)
+
+
+def test_tar_stream_transfer_exception(popen, images):
+    with pytest.raises(ValueError, match="compression"):
+        tar_stream_transfer(images, "/opt/tests", "ip", compression="zip")
+    proc = popen.return_value.__enter__.return_value
+    proc.returncode = 2
+    proc.stdout = io.BytesIO(b"tar: write error")
+    with pytest.raises(ConnectionError, match="tar: write error"):
+        tar_stream_transfer(images, "/opt/tests", "ip")
+
+
+@pytest.fixture
+def fake_ssh(tmpdir, monkeypatch):
+    def _fake_ssh(script):
+        ssh = tmpdir.join("ssh")
+        ssh.write(f"#!/bin/sh\n{script}\n")
+        ssh.chmod(0o755)
+        monkeypatch.setenv("PATH", f"{tmpdir}:{os.environ['PATH']}")
+
+    return _fake_ssh
+
+
+def test_tar_stream_transfer_remote_output(fake_ssh, images):
+    # Remote output beyond the pipe buffer must not block the transfer
+    fake_ssh("head -c 200000 /dev/zero; cat > /dev/null")
+    with open(os.path.join(images, "rootfs.cpio"), "wb") as fd:
+        fd.write(b"r" * 2**18)
+    stats = tar_stream_transfer(images, "/opt/tests", "ip", timeout=10)
+    assert stats["files"] == 4
+    assert stats["bytes"] > 2**18
+
+
+def test_tar_stream_transfer_timeout(fake_ssh, images):
+    fake_ssh("exec sleep 30")
+    start = time.monotonic()
+    with pytest.raises(ConnectionError, match="Timed out"):
+        tar_stream_transfer(images, "/opt/tests", "ip", timeout=1)
+    assert time.monotonic() - start < 10
+
+
+def test_scp_file_transfer_tar_threshold(c, mocker, images):
+    c.sync = mocker.Mock("sync")
+    c.sendline = mocker.Mock("sendline")
+    c.prompt = "#"
+    c.expect = mocker.Mock("expect", side_effect=[0, 2])
+    c._exit_non_zero_return = mocker.Mock("_exit_non_zero_return", return_value=0)
+    c.config = {"images": images, "target_path": "/opt"}
+    opts = "-o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null"
+    scp_file_transfer(c, target_ip="ip", tar_threshold=3)
+    assert c.sendline.call_args_list == [
+        mocker.call(
+            f"tar -C {images} -cf - . | ssh {opts} root@ip "
+            "'mkdir -p /opt && tar -xf - -C /opt'"
+        ),
+        mocker.call("root"),
+    ]
+
+    c.sendline.reset_mock()
+    c.expect.side_effect = [2]
+    scp_file_transfer(c, images=images, target_ip="ip", tar_threshold=4)
+    assert c.sendline.call_args.args[0].startswith("scp")
+
+    c.sendline.reset_mock()
+    c.expect.side_effect = [2]
+    scp_file_transfer(c, images=images, target_ip="ip", tar_threshold=3)
+    assert c.sendline.call_args.args[0].endswith(
+        "'mkdir -p /opt/images && tar -xf - -C /opt/images'"
+    )
+
+    c.expect.side_effect = [2]
+    scp_file_transfer(
+        c, images=images, target_ip="ip", tar_threshold=3, tar_compression="xz"
+    )
+    assert c.sendline.call_args.args[0].startswith(f"tar -C {images} -cJf - .")
+    assert c.sendline.call_args.args[0].endswith("tar -xJf - -C /opt/images'")
+    with pytest.raises(ValueError, match="compression"):
+        scp_file_transfer(c, target_ip="ip", tar_threshold=3, tar_compression="zst")
+
+
+def test_scp_file_transfer_tar_fallback(c, mocker, images):
+    c.sync = mocker.Mock("sync")
+    c.sendline = mocker.Mock("sendline")
+    c.sendcontrol = mocker.Mock("sendcontrol")
+    c.prompt = "#"
+    c.expect = mocker.Mock(
+        "expect", side_effect=[ExpectError("tar: command not found"), 2]
+    )
+    c._exit_non_zero_return = mocker.Mock("_exit_non_zero_return", return_value=0)
+    c.config = {"images": images, "target_path": "/opt"}
+    scp_file_transfer(c, target_ip="ip", tar_threshold=3)
+    c.sendcontrol.assert_called_once_with("c")
+    assert c.sendline.call_args_list[0].args[0].startswith("tar")
+    assert c.sendline.call_args_list[1] == mocker.call(
+        "scp -r -q -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null "
+        f"{images}/* root@ip:/opt"
+    )
+
+    # A stream still prompting after its attempts is not reported as sent
+    c.sendline.reset_mock()
+    c.expect.side_effect = [0] * 5 + [2]
+    scp_file_transfer(c, target_ip="ip", tar_threshold=3)
+    assert c.sendline.call_args_list[-1].args[0].startswith("scp")
+    assert c.sendcontrol.call_count == 2
@@ -0,0 +1,66 @@
+#
+# Copyright (c) 2020 Xilinx, Inc. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+
+import json
+import math
+from roast.telemetry import TelemetrySampler, parse_telemetry
+
+OUTPUT = """cpu  {busy} 0 0 {idle} {iowait} 0 0 0 0 0
+MemTotal:        4000000 kB
+MemAvailable:    1000000 kB
+SwapTotal:        100000 kB
+SwapFree:          40000 kB
+temp: 45000
+temp: 52500
+"""
+
+
+def output(busy, idle, iowait):
+    return OUTPUT.format(busy=busy, idle=idle, iowait=iowait)
+
+
+def test_parse_telemetry():
+    sample = parse_telemetry(output(100, 800, 100))
+    assert sample["cpu"] == (1000, 800, 100)
+    assert sample["MemAvailable"] == 1000000
+    assert sample["temp"] == 52.5
+    assert parse_telemetry("")["temp"] is None
+
+
+def test_telemetry_sampler(mocker, tmpdir):
+    console = mocker.Mock()
+    console.output.side_effect = [output(100, 800, 100), output(400, 900, 200)]
+    sampler = TelemetrySampler(console)
+    sampler.sample()
+    sampler.sample()
+    assert console.runcmd.call_count == 2
+    assert list(sampler.series["cpu"][1:]) == [60.0]
+    assert list(sampler.series["iowait"][1:]) == [20.0]
+    assert math.isnan(sampler.series["cpu"][0])
+    assert list(sampler.series["mem_used"]) == [75.0, 75.0]
+    assert list(sampler.series["swap_used"]) == [60000.0, 60000.0]
+    summary = sampler.summary()
+    assert summary["samples"] == 2
+    assert summary["cpu"] == {"mean": 60.0, "max": 60.0}
+    assert summary["temp"]["max"] == 52.5
+    properties = {}
+    sampler.attach(properties.__setitem__)
+    assert json.loads(properties["telemetry"]) == summary
+    path = str(tmpdir.join("telemetry.json"))
+    sampler.save(path)
+    with open(path) as fd:
+        assert json.load(fd)["series"]["cpu"][0] is None
+
+
+def test_telemetry_sampler_background(mocker):
+    console = mocker.Mock()
+    console.output.return_value = output(100, 800, 100)
+    with TelemetrySampler(console, interval=0.01) as sampler:
+        for _ in range(100):
+            if len(sampler.series["time"]) >= 2:
+                break
+            sampler._stop.wait(0.01)
+    assert len(sampler.series["time"]) >= 2
+    assert sampler.errors == 0
@@ -0,0 +1,121 @@
+#
+# Copyright (c) 2020 Xilinx, Inc. All rights reserved.
+# SPDX-License-Identifier: MIT
+#
+
+import time
+import logging
+import pytest
+from roast.xexpect import Xexpect
+from roast.exceptions import ExpectError
+from roast.timeouts import TimeoutModel, command_signature, percentile
+from roast.utils import read_json
+
+
+def test_command_signature():
+    assert command_signature("sleep 5") == command_signature("sleep 10")
+    assert command_signature("devmem 0xFF0A0000 32") == "devmem # #"
+    assert command_signature("  ls -l  /tmp") == "ls -l /tmp"
+    assert command_signature("cd /opt/tests && ./run_all.sh") != command_signature(
+        "cd /opt/tests && ls"
+    )
+    assert command_signature("devmem 0xFF0A0000 32", tokens=1) == "devmem"
+
+
+def test_percentile():
+    assert percentile([3, 1, 2], 50) == 2
+    assert percentile(list(range(1, 101)), 95) == 95
+    assert percentile([7], 99) == 7
+
+
+def test_timeout_model(tmpdir):
+    store = str(tmpdir.join("timeouts.json"))
+    model = TimeoutModel(store, min_samples=3, margin=2, min_timeout=1)
+    assert model.timeout("board", "sleep 1", 200) == 200
+    for duration in (1.0, 2.0, 3.0):
+        model.record("board", "sleep 1", duration)
+    assert model.timeout("board", "sleep 2", 200) == 6.0
+    assert model.timeout("other", "sleep 2", 200) == 200
+
+    model.max_timeout = 4
+    assert model.timeout("board", "sleep 2", 200) == 4
+    model.record("board", "echo hi", 0.01)
+    model.min_samples = 1
+    assert model.timeout("board", "echo hi", 200) == 1
+
+
+def test_timeout_model_backoff(tmpdir):
+    store = str(tmpdir.join("timeouts.json"))
+    model = TimeoutModel(store, min_samples=3, margin=2, min_timeout=1)
+    for duration in (1.0, 1.0, 1.0):
+        model.record("board", "make", duration)
+    assert model.timeout("board", "make", 200) == 2.0
+    # A slower board is not failed again by its history
+    model.record_timeout("board", "make", 2.0)
+    assert model.timeout("board", "make", 200) == 4.0
+    model.record_timeout("board", "make", 4.0)
+    assert model.timeout("board", "make", 200) == 8.0
+    assert model.history["board|make"][-2:] == [2.0, 4.0]
+
+
+def test_timeout_model_signature(tmpdir):
+    store = str(tmpdir.join("timeouts.json"))
+    model = TimeoutModel(store, signature=lambda cmd: cmd.split()[0])
+    model.record("board", "ls -l", 1)
+    assert list(model.history) == ["board|ls"]
+
+
+def test_timeout_model_store(tmpdir):
+    store = str(tmpdir.join("timeouts.json"))
+    first = TimeoutModel(store, max_samples=4)
+    second = TimeoutModel(store, max_samples=4)
+    for n in range(3):
+        first.record("board", "boot", n)
+        second.record("board", "boot", 10 + n)
+    first.save()
+    second.save()
+    assert read_json(store) == {"board|boot": [2, 10, 11, 12]}
+    assert TimeoutModel(store).history["board|boot"] == [2, 10, 11, 12]
+
+
+def test_replay_adaptive_timeout(session, tmpdir):
+    x = Xexpect.replay(logging.getLogger("roast"), session, speed=0)
+    model = x.enable_adaptive_timeout(str(tmpdir.join("timeouts.json")))
+    x.runcmd("uname -r")
+    assert list(model.history) == ["replay|uname -r"]
+
+
+def test_replay_adaptive_timeout_expired(empty_session, tmpdir, mocker):
+    x = Xexpect.replay(logging.getLogger("roast"), empty_session, speed=0)
+    model = x.enable_adaptive_timeout(
+        str(tmpdir.join("timeouts.json")), min_samples=1, margin=1, min_timeout=0.1
+    )
+    model.record("replay", "sleep 1", 0.1)
+
+    def _expect(*args, timeout, **kwargs):
+        time.sleep(timeout)
+        raise ExpectError("ERROR: Expect returned TIMEOUT")
+
+    mocker.patch.object(x, "expect", side_effect=_expect)
+    with pytest.raises(ExpectError):
+        x.runcmd("sleep 1")
+    assert model.history["replay|sleep #"] == [0.1, 0.1]
+    assert model.timeout("replay", "sleep 2", 200) == 0.2
+
+    # Failures ending the expect early are not timeouts
+    x.expect.side_effect = ExpectError("ERROR: Expect returned EOF")
+    with pytest.raises(ExpectError):
+        x.runcmd("sleep 1")
+    assert model.history["replay|sleep #"] == [0.1, 0.1]
+
+    # Nor are failures before the timeout scaled by timeout_multiplier
+    x.timeout_multiplier = 3
+
+    def _expect_failure(*args, timeout, **kwargs):
+        time.sleep(timeout)
+        raise ExpectError("Kernel panic")
+
+    x.expect.side_effect = _expect_failure
+    with pytest.raises(ExpectError):
+        x.runcmd("sleep 1")
+    assert model.history["replay|sleep #"] == [0.1, 0.1]
@@ -3,10 +3,13 @@
 # SPDX-License-Identifier: MIT
 #
 
+import time
 import logging
 import socket
 import pytest
-from roast.xexpect import Xexpect
+import pexpect
+from roast.xexpect import Xexpect, login_many, backoff_delay
+from roast.replay import ReplaySpawn
 
 
 @pytest.fixture
@@ -16,8 +19,8 @@ def logger():
 
 def test_xexpect_init(logger, mocker):
     mock_ssh_login = mocker.patch("roast.xexpect.ssh_login")
-    Xexpect.sendline = mocker.Mock("sendline")
-    Xexpect.expect = mocker.Mock("expect", return_value=3)
+    mocker.patch.object(Xexpect, "sendline")
+    mocker.patch.object(Xexpect, "expect", return_value=3)
     x = Xexpect(logger)
     mock_ssh_login.assert_called_with(x)
     assert x.ip == socket.gethostname()
@@ -31,3 +34,113 @@ def test_xexpect_init(logger, mocker):
     mock_ssh_login_user = mocker.patch("roast.xexpect.ssh_login_user")
     x = Xexpect(logger, userid="user", password="password")
     mock_ssh_login_user.assert_called_with(x, "user", "password")
+
+    x = Xexpect(
+        logger, userid="user", password="password", login_timeout=10, login_retries=1
+    )
+    mock_ssh_login_user.assert_called_with(
+        x, "user", "password", timeout=10, connect_timeout=10, retries=1
+    )
+
+
+def test_xexpect_init_failure(logger, mocker):
+    mocker.patch("roast.xexpect.ssh_login", side_effect=ConnectionError("down"))
+    mock_register = mocker.patch("atexit.register")
+    mock_unregister = mocker.patch("atexit.unregister")
+    with pytest.raises(ConnectionError):
+        Xexpect(logger, hostip="down")
+    # The exit hook of a console which failed to open is dropped
+    assert mock_unregister.call_args == mock_register.call_args
+
+
+def test_backoff_delay(mocker):
+    mock_uniform = mocker.patch("random.uniform", return_value=1.5)
+    assert backoff_delay(3, base=1, cap=5) == 1.5
+    mock_uniform.assert_called_with(0, 5)
+    backoff_delay(2, base=1, cap=30)
+    mock_uniform.assert_called_with(0, 4)
+
+
+def test_login_many(logger, mocker):
+    mock_sleep = mocker.patch("time.sleep")
+    attempts = {}
+
+    def _xexpect(log, hostname, hostip, userid, password, login_timeout, login_retries):
+        assert (login_timeout, login_retries) == (30, 1)
+        attempts[hostip] = attempts.get(hostip, 0) + 1
+        if hostip == "down" or (hostip == "flaky" and attempts[hostip] < 3):
+            raise ConnectionError(f"Failed to establish ssh connection with {hostip}")
+        return hostip
+
+    mocker.patch("roast.xexpect.Xexpect", side_effect=_xexpect)
+    consoles, summary = login_many(
+        logger, ["up", "flaky", "down"], userid="root", password="root", retries=4
+    )
+    assert consoles == {"up": "up", "flaky": "flaky"}
+    assert summary["up"]["status"] == "ok"
+    assert summary["flaky"]["attempts"] == 3
+    assert summary["down"]["status"] == "unreachable"
+    assert summary["down"]["attempts"] == 4
+    assert "down" in summary["down"]["error"]
+    assert mock_sleep.call_count == 2 + 3
+
+
+def test_runcmd_reconnect(session, empty_session, mocker):
+    x = Xexpect.replay(logging.getLogger("roast"), empty_session, speed=0)
+    x.auto_reconnect = True
+
+    def _setup_ssh(userid, password):
+        x.terminal = ReplaySpawn(session, speed=0)
+
+    mocker.patch.object(x, "_setup_ssh", side_effect=_setup_ssh)
+    mocker.patch.object(x, "_setup_init")
+    x.runcmd("uname -r")
+    assert "5.10.0-xilinx" in x.output()
+    assert x.health()["reconnects"] == 1
+    assert x.prompt == "root@board:~# "
+
+
+def test_keepalive_reconnect(empty_session, mocker):
+    x = Xexpect.replay(logging.getLogger("roast"), empty_session, speed=0)
+    mock_reconnect = mocker.patch.object(x, "reconnect")
+    x.start_keepalive(interval=0.01, probe_timeout=0.01)
+    for _ in range(200):
+        if mock_reconnect.called:
+            break
+        time.sleep(0.01)
+    x.stop_keepalive()
+    assert mock_reconnect.called
+
+
+def test_keepalive_probe(logger, mocker):
+    terminal = mocker.Mock()
+    terminal.before, terminal.after, terminal.match = "uname -r\r\n5.10.0", "# ", "m"
+    x = Xexpect(logger, hostip="board", terminal=terminal)
+    # A slow prompt is not a lost console
+    terminal.expect.side_effect = pexpect.TIMEOUT("probe")
+    assert x._probe(0.01)
+    terminal.expect.side_effect = pexpect.EOF("probe")
+    assert not x._probe(0.01)
+    # The output of the last command survives the probe
+    assert (terminal.before, terminal.after, terminal.match) == (
+        "uname -r\r\n5.10.0",
+        "# ",
+        "m",
+    )
+
+
+def test_keepalive_in_flight(logger, mocker):
+    x = Xexpect(logger, hostip="board", terminal=mocker.Mock())
+    mock_probe = mocker.patch.object(x, "_probe", return_value=True)
+    x.runcmd_async("dmesg -w")
+    x.start_keepalive(interval=0.01, probe_timeout=0.01)
+    time.sleep(0.1)
+    assert not mock_probe.called
+    x.terminal.expect.return_value = 2
+    x.expect()
+    for _ in range(200):
+        if mock_probe.called:
+            break
+        time.sleep(0.01)
+    x.stop_keepalive()
+    assert mock_probe.called